@@ -8,3 +8,44 @@ SECRET_KEY = os.getenv("ALPACA_SECRET_KEY")
 ALPACA_API_BASE_URL = os.getenv("ALPACA_API_BASE_URL", "https://paper-api.alpaca.markets")
 MOCK_API_BASE_URL = os.getenv("MOCK_API_BASE_URL", "http://localhost:8000")
 MARKET_DATA_SIMULATOR_URL = os.getenv("MARKET_DATA_SIMULATOR_URL", "http://localhost:8001")
+
+# Static asset universe served by the mock trading service
+ASSET_UNIVERSE_SIZE = int(os.getenv("ASSET_UNIVERSE_SIZE", "5000"))
+ASSET_UNIVERSE_SEED = int(os.getenv("ASSET_UNIVERSE_SEED", "42"))
+ASSET_UNIVERSE_FILE = os.getenv("ASSET_UNIVERSE_FILE") # Optional CSV of additional listings
+# When true (default), orders for symbols outside the universe are rejected; false lists them on first use
+STRICT_ASSET_VALIDATION = os.getenv("STRICT_ASSET_VALIDATION", "true").lower() in ("1", "true", "yes")
+PORTFOLIO_HISTORY_INTERVAL = float(os.getenv("PORTFOLIO_HISTORY_INTERVAL", "60")) # Seconds between equity recordings (fills are also recorded)
+ORDER_CACHE_MAX_BYTES = int(os.getenv("ORDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) # Size bound of the serialized terminal order cache
+# Pre-trade risk: buying power is (equity - initial margin) * multiplier; 1 is a cash account, which cannot short
+ACCOUNT_MULTIPLIER = int(os.getenv("ACCOUNT_MULTIPLIER", "2"))
+SHORTING_ENABLED = os.getenv("SHORTING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Market data simulator
+MARKET_DATA_SEED = int(os.getenv("MARKET_DATA_SEED", "42"))
+MARKET_TICK_INTERVAL = float(os.getenv("MARKET_TICK_INTERVAL", "1.0")) # Seconds between quote ticks
+# Symbols tracked from startup; others start being tracked on first request
+MARKET_DATA_SYMBOLS = [s.strip().upper() for s in os.getenv("MARKET_DATA_SYMBOLS", "AAPL,MSFT,TSLA,GOOG,AMZN,NVDA,SPY").split(",") if s.strip()]
+TRADES_PER_DAY = int(os.getenv("TRADES_PER_DAY", "2000")) # Average trades per symbol per simulated (UTC) day
+TAPE_CACHE_DAYS = int(os.getenv("TAPE_CACHE_DAYS", "512")) # (symbol, day) trade tapes kept in memory
+BAR_CACHE_MAX_BYTES = int(os.getenv("BAR_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) # Size bound of the historical bar response cache
+
+# Traffic recording: when set, both apps append every request to this JSONL file (replay with python -m traffic.replay)
+TRAFFIC_RECORD_FILE = os.getenv("TRAFFIC_RECORD_FILE")
+
+# Per-request profiling: when PROFILE_DIR is set, requests with an X-Profile header (and a
+# PROFILE_SAMPLE_RATE fraction of all requests) are profiled into that directory
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile") # cprofile (pstats .prof) or sampling (.speedscope.json)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001")) # Seconds between stack samples in sampling mode
+
+# Launcher (launcher.py)
+SIMULATOR_MODE = os.getenv("SIMULATOR_MODE", "single") # "single": both apps in one process, "processes": one child process per app
+MOCK_SERVICE_WORKERS = int(os.getenv("MOCK_SERVICE_WORKERS", "1")) # Keep at 1: trading state lives in process memory
+MARKET_DATA_WORKERS = int(os.getenv("MARKET_DATA_WORKERS", "1"))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto") # auto (uvloop if installed), asyncio or uvloop
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto") # auto (httptools if installed), h11 or httptools
+SERVER_LOG_LEVEL = os.getenv("SERVER_LOG_LEVEL", "info")
+# Set by the launcher for its child processes and echoed by /readyz, so it can tell its own servers from another process on the port
+SIMULATOR_INSTANCE = os.getenv("SIMULATOR_INSTANCE")
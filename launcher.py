@@ -0,0 +1,226 @@
+"""Start the mock trading service and the market data simulator with one command.
+
+    python launcher.py                      # both apps in one process, on their two ports
+    python launcher.py --mode processes     # one managed child process per app
+
+Both apps serve /healthz (the process is up) and /readyz (startup data is warm). The
+launcher reports once both of its own servers are ready, and exits with an error if either
+cannot start (e.g. its port is taken). Heavy modules (FastAPI, the apps) are only imported
+where they run, so the parent process of "processes" mode stays light.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import List, Tuple, Callable, Optional
+from urllib.error import URLError
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from config.settings import (
+    MOCK_API_BASE_URL,
+    MARKET_DATA_SIMULATOR_URL,
+    SIMULATOR_MODE,
+    MOCK_SERVICE_WORKERS,
+    MARKET_DATA_WORKERS,
+    SERVER_LOOP,
+    SERVER_HTTP,
+    SERVER_LOG_LEVEL,
+)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (name, app import string, base URL, default port)
+APPS = [
+    ("mock trading service", "mock_service.main:app", MOCK_API_BASE_URL, 8000),
+    ("market data simulator", "market_data_simulator.main:app", MARKET_DATA_SIMULATOR_URL, 8001),
+]
+
+
+def log(message: str) -> None:
+    print(f"[launcher] {message}", flush=True)
+
+
+def host_port(url: str, default_port: int) -> Tuple[str, int]:
+    parsed_url = urlparse(url)
+    return parsed_url.hostname or "localhost", parsed_url.port or default_port
+
+
+def resolve_option(value: str, fast: str, fallback: str) -> str:
+    """Resolve "auto" to the fast implementation when it is installed."""
+    if value == "auto":
+        return fast if importlib.util.find_spec(fast) else fallback
+    if value == fast and not importlib.util.find_spec(fast):
+        raise SystemExit(f"{fast} is not installed (pip install {fast})")
+    return value
+
+
+def is_ready(host: str, port: int, instance: Optional[str] = None) -> bool:
+    """Whether /readyz answers 200, from the server started with `instance` when given."""
+    try:
+        with urlopen(f"http://{host}:{port}/readyz", timeout=1) as resp:
+            return resp.status == 200 and (instance is None or json.load(resp).get("instance") == instance)
+    except (URLError, OSError, ValueError):
+        return False
+
+
+def wait_ready(endpoints: List[Tuple[str, int]], timeout: float, keep_waiting: Callable[[], bool],
+               listening: Callable[[], bool], instance: Optional[str]) -> bool:
+    deadline = time.monotonic() + timeout
+    pending = list(endpoints)
+    while pending and time.monotonic() < deadline and keep_waiting():
+        # Only poll once our own servers hold their ports; before that, another process may answer
+        if listening():
+            pending = [endpoint for endpoint in pending if not is_ready(*endpoint, instance)]
+        if pending:
+            time.sleep(0.05)
+    return not pending
+
+
+def report_ready(endpoints: List[Tuple[str, int]], started: float, timeout: float,
+                 keep_waiting: Callable[[], bool], listening: Callable[[], bool] = lambda: True,
+                 instance: Optional[str] = None) -> None:
+    if wait_ready(endpoints, timeout, keep_waiting, listening, instance):
+        log(f"ready in {time.monotonic() - started:.2f}s")
+    elif keep_waiting():
+        log(f"not ready after {timeout:.0f}s")
+
+
+def run_single(args: argparse.Namespace, endpoints: List[Tuple[str, int]]) -> int:
+    """Both apps as two uvicorn servers sharing one event loop."""
+    import asyncio
+    import uvicorn
+
+    started = time.monotonic()
+    servers = [
+        uvicorn.Server(uvicorn.Config(app_path, host=host, port=port, loop="none", http=args.http,
+                                      log_level=args.log_level))
+        for (_, app_path, _, _), (host, port) in zip(APPS, endpoints)
+    ]
+
+    def stop_all(sig, frame):
+        # uvicorn hands a signal it caught back to the previous handler once its server stops;
+        # stop both servers instead of raising KeyboardInterrupt (a repeated signal forces it)
+        for server in servers:
+            server.force_exit = server.should_exit
+            server.should_exit = True
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, stop_all)
+
+    async def serve(server) -> int:
+        # uvicorn raises SystemExit when a server cannot start (e.g. its port is taken); turn it
+        # into the task's result so it neither escapes the event loop nor goes unretrieved
+        try:
+            await server.serve()
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        return 0
+
+    async def serve_all() -> int:
+        tasks = [asyncio.ensure_future(serve(server)) for server in servers]
+        failed = []
+        loop = asyncio.get_running_loop()
+        watcher = loop.run_in_executor(None, report_ready, endpoints, started, args.ready_timeout,
+                                       lambda: not failed and not any(server.should_exit for server in servers),
+                                       lambda: all(server.started for server in servers))
+        # When one server stops (signal or failure), stop the other one too
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        failed.extend(task.result() for task in tasks if task.done() and task.result())
+        for server in servers:
+            server.should_exit = True
+        codes = await asyncio.gather(*tasks)
+        await watcher
+        for (name, _, _, _), (host, port), code in zip(APPS, endpoints, codes):
+            if code:
+                log(f"{name} failed to start on {host}:{port}")
+        return next((code for code in codes if code), 0)
+
+    if args.loop == "uvloop":
+        import uvloop
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(serve_all())
+    finally:
+        loop.close()
+
+
+def run_processes(args: argparse.Namespace, endpoints: List[Tuple[str, int]]) -> int:
+    """Each app in its own uvicorn child process (with its own workers), stopped together."""
+    started = time.monotonic()
+    if args.trading_workers > 1:
+        log("warning: the mock trading service keeps state in memory; each of its workers has its own account")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT, env.get("PYTHONPATH")) if p)
+    # Echoed by each child's /readyz, so a server of another process on the same port is not taken for ours
+    instance = env["SIMULATOR_INSTANCE"] = uuid.uuid4().hex
+
+    children: List[subprocess.Popen] = []
+    for (name, app_path, _, _), (host, port), workers in zip(APPS, endpoints, (args.trading_workers, args.market_data_workers)):
+        cmd = [sys.executable, "-m", "uvicorn", app_path, "--host", host, "--port", str(port),
+               "--workers", str(workers), "--loop", args.loop, "--http", args.http, "--log-level", args.log_level]
+        children.append(subprocess.Popen(cmd, cwd=ROOT, env=env))
+        log(f"started {name} on {host}:{port} (pid {children[-1].pid}, {workers} worker(s))")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda sig, frame: stopping.append(sig))
+    try:
+        report_ready(endpoints, started, args.ready_timeout,
+                     lambda: not stopping and all(child.poll() is None for child in children), instance=instance)
+        while not stopping and all(child.poll() is None for child in children):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+
+    for (name, _, _, _), child in zip(APPS, children):
+        if child.poll() is not None and not stopping:
+            log(f"{name} exited with code {child.returncode}")
+    # Stop whatever is still running, then report the first failure
+    for child in children:
+        if child.poll() is None:
+            child.terminate()
+    for child in children:
+        try:
+            child.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            child.kill()
+            child.wait()
+    return next((child.returncode for child in children if child.returncode not in (0, -signal.SIGTERM)), 0)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the mock trading service and the market data simulator.")
+    parser.add_argument("--mode", choices=["single", "processes"], default=SIMULATOR_MODE)
+    parser.add_argument("--trading-workers", type=int, default=MOCK_SERVICE_WORKERS)
+    parser.add_argument("--market-data-workers", type=int, default=MARKET_DATA_WORKERS)
+    parser.add_argument("--loop", choices=["auto", "asyncio", "uvloop"], default=SERVER_LOOP)
+    parser.add_argument("--http", choices=["auto", "h11", "httptools"], default=SERVER_HTTP)
+    parser.add_argument("--log-level", default=SERVER_LOG_LEVEL)
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="seconds to wait for /readyz")
+    args = parser.parse_args(argv)
+
+    if args.mode == "single" and (args.trading_workers > 1 or args.market_data_workers > 1):
+        parser.error("worker counts above 1 need --mode processes")
+    args.loop = resolve_option(args.loop, "uvloop", "asyncio")
+    args.http = resolve_option(args.http, "httptools", "h11")
+    endpoints = [host_port(url, default_port) for _, _, url, default_port in APPS]
+    log(f"mode={args.mode} loop={args.loop} http={args.http}")
+
+    try:
+        if args.mode == "single":
+            return run_single(args, endpoints)
+        return run_processes(args, endpoints)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import math
+import random
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+
+SECTORS = 11
+FACTORS = 1 + SECTORS  # the market factor, then one factor per sector
+# Daily volatility of the market factor, of each sector factor and of a stock's own noise
+MARKET_VOLATILITY = 0.009
+SECTOR_VOLATILITY = 0.006
+IDIOSYNCRATIC_VOLATILITY = 0.01
+# Factor paths (and the trade tape) start at EPOCH; daily shocks are drawn in blocks of days
+EPOCH = date(2000, 1, 1)
+FACTOR_BLOCK_DAYS = 1024
+MINUTES_PER_DAY = 1440
+MICROS_PER_MINUTE = 60_000_000
+MICROS_PER_DAY = MINUTES_PER_DAY * MICROS_PER_MINUTE
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+MAX_CACHED_FACTOR_BLOCKS = 64
+MAX_CACHED_FACTOR_DAYS = 8
+
+
+def factor_loadings(seed: int, symbol: str) -> Tuple[float, int, float, float, float]:
+    """A symbol's (market beta, sector, sector loading, idiosyncratic scale, half spread in bps).
+
+    Derived from the seed and the symbol only, so a symbol behaves the same whichever other
+    symbols are tracked."""
+    rng = random.Random(f"{seed}:{symbol}:factors")
+    sector = zlib.crc32(f"{seed}:{symbol}".encode()) % SECTORS
+    return rng.uniform(0.6, 1.4), sector, rng.uniform(0.3, 1.0), rng.uniform(0.6, 1.4), rng.uniform(0.5, 5.0)
+
+
+def exposure(levels: np.ndarray, beta: float, sector: int, gamma: float) -> np.ndarray:
+    """Log-price move a symbol's loadings give to factor levels (the last axis is the factor)."""
+    return beta * MARKET_VOLATILITY * levels[..., 0] + gamma * SECTOR_VOLATILITY * levels[..., 1 + sector]
+
+
+class FactorPaths:
+    """Market and sector factor paths shared by every symbol, as functions of time.
+
+    Each factor gets one standard normal shock per day, from the seed alone; its level at the
+    start of a day is the sum of the shocks of the days before. Within a day the level follows
+    a Brownian bridge on a one-minute grid from that start to the start of the next day, so a
+    day's intraday path ends exactly at its daily shock. Daily closes, intraday trades and live
+    quotes of every symbol all load on these same paths, which is what makes them co-move.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self._blocks: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._block_starts: List[np.ndarray] = [np.zeros(FACTORS)]
+        self._days: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._minute_grid = np.arange(MINUTES_PER_DAY + 1, dtype=np.float64)
+
+    def _block(self, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        # (daily shocks, level at the start of each day) for FACTOR_BLOCK_DAYS days
+        cached = self._blocks.get(block)
+        if cached is not None:
+            self._blocks.move_to_end(block)
+            return cached
+        while len(self._block_starts) <= block:
+            previous = len(self._block_starts) - 1
+            self._block_starts.append(self._block_starts[previous] + self.daily_shocks(previous).sum(axis=0))
+        shocks = self._shocks(block)
+        starts = self._block_starts[block] + np.cumsum(shocks, axis=0) - shocks
+        self._blocks[block] = (shocks, starts)
+        if len(self._blocks) > MAX_CACHED_FACTOR_BLOCKS:
+            self._blocks.popitem(last=False)
+        return shocks, starts
+
+    def _shocks(self, block: int) -> np.ndarray:
+        rng = np.random.default_rng([self.seed & 0xFFFFFFFF, 0, 2, block])
+        return rng.standard_normal((FACTOR_BLOCK_DAYS, FACTORS))
+
+    def daily_shocks(self, block: int) -> np.ndarray:
+        """Shocks of every factor (columns) for each day of a block (rows)."""
+        cached = self._blocks.get(block)
+        return cached[0] if cached is not None else self._shocks(block)
+
+    def day_levels(self, ordinal: int) -> np.ndarray:
+        """Levels of every factor at each minute of a day, MINUTES_PER_DAY + 1 rows."""
+        levels = self._days.get(ordinal)
+        if levels is not None:
+            self._days.move_to_end(ordinal)
+            return levels
+        day = ordinal - EPOCH.toordinal()
+        if day < 0:
+            levels = np.zeros((MINUTES_PER_DAY + 1, FACTORS))
+        else:
+            block, offset = divmod(day, FACTOR_BLOCK_DAYS)
+            shocks, starts = self._block(block)
+            rng = np.random.default_rng([self.seed & 0xFFFFFFFF, 0, 3, ordinal])
+            levels = np.zeros((MINUTES_PER_DAY + 1, FACTORS))
+            np.cumsum(rng.standard_normal((MINUTES_PER_DAY, FACTORS)) / math.sqrt(MINUTES_PER_DAY),
+                      axis=0, out=levels[1:])
+            levels += (self._minute_grid / MINUTES_PER_DAY)[:, None] * (shocks[offset] - levels[-1])
+            levels += starts[offset]
+        self._days[ordinal] = levels
+        if len(self._days) > MAX_CACHED_FACTOR_DAYS:
+            self._days.popitem(last=False)
+        return levels
+
+    def levels(self, ordinal: int, ts_us: np.ndarray) -> np.ndarray:
+        """Levels of every factor (columns) at timestamps within a day (rows), interpolated
+        linearly between minutes."""
+        grid = self.day_levels(ordinal)
+        minutes = (np.asarray(ts_us, dtype=np.float64) - (ordinal - UNIX_EPOCH_ORDINAL) * MICROS_PER_DAY) / MICROS_PER_MINUTE
+        np.clip(minutes, 0, MINUTES_PER_DAY, out=minutes)
+        index = np.minimum(minutes.astype(np.intp), MINUTES_PER_DAY - 1)
+        weight = (minutes - index)[:, None]
+        return grid[index] * (1 - weight) + grid[index + 1] * weight
+
+    def level(self, t_us: int) -> np.ndarray:
+        """Levels of every factor at one point in time."""
+        ordinal, offset_us = divmod(t_us, MICROS_PER_DAY)
+        grid = self.day_levels(ordinal + UNIX_EPOCH_ORDINAL)
+        index, remainder = divmod(offset_us, MICROS_PER_MINUTE)
+        weight = remainder / MICROS_PER_MINUTE
+        return grid[index] * (1 - weight) + grid[index + 1] * weight
@@ -1,137 +1,281 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Header
+from fastapi.responses import Response
 import uvicorn
-from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from urllib.parse import urlparse
 from datetime import datetime, timezone
-import random
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import json
 
-from config.settings import MARKET_DATA_SIMULATOR_URL
+from config.settings import (
+    MARKET_DATA_SIMULATOR_URL,
+    MARKET_DATA_SEED,
+    MARKET_TICK_INTERVAL,
+    MARKET_DATA_SYMBOLS,
+    TRADES_PER_DAY,
+    TAPE_CACHE_DAYS,
+    BAR_CACHE_MAX_BYTES,
+    TRAFFIC_RECORD_FILE,
+    PROFILE_DIR,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SAMPLE_INTERVAL,
+    SIMULATOR_INSTANCE,
+)
+from market_data_simulator.state import LatestStateCache
+from market_data_simulator.tape import (
+    MarketTape, parse_rfc3339, parse_timeframe, micros_to_datetime, datetime_to_micros, bar_to_dict
+)
+from market_data_simulator.response_cache import ResponseCache, etag_matches, make_etag
 
-app = FastAPI()
+# Deterministic trade tape for every symbol; bars of every timeframe are aggregated from it
+market_tape = MarketTape(seed=MARKET_DATA_SEED, trades_per_day=TRADES_PER_DAY, max_cached_days=TAPE_CACHE_DAYS)
+# Latest trade/quote/bar state per symbol, advanced incrementally by the background ticker
+latest_state = LatestStateCache(market_tape, seed=MARKET_DATA_SEED)
+# Serialized historical bar responses, keyed on the normalized request and the seed
+bar_response_cache = ResponseCache(max_bytes=BAR_CACHE_MAX_BYTES)
 
-# --- Quote Data Models and Endpoint ---
-class QuoteData(BaseModel):
-    ask_price: float = Field()
-    ask_size: float = Field() # Changed to float
-    ask_exchange: Optional[str] = Field(default=None) # Changed to Optional[str]
-    bid_price: float = Field()
-    bid_size: float = Field() # Changed to float
-    bid_exchange: Optional[str] = Field(default=None) # Changed to Optional[str]
-    conditions: Optional[List[str]] = Field(default=None)
-    timestamp: str = Field()
-    tape: Optional[str] = Field(default=None)
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 10000
 
-    model_config = {
-        "populate_by_name": True
-    }
+async def run_ticker():
+    while True:
+        await asyncio.sleep(MARKET_TICK_INTERVAL)
+        # Yield whenever a symbol rolls over to a newly generated day, so midnight doesn't
+        # stall other requests
+        for _ in latest_state.tick_steps():
+            await asyncio.sleep(0)
 
-@app.get("/v2/stocks/quotes/latest", response_model=Dict[str, QuoteData])
+# Set once the startup symbols' tapes are generated and their latest state is built
+ready = False
+
+async def track_symbols(symbols: List[str]):
+    # Start tracking new symbols one at a time, yielding in between, so other requests (and
+    # /healthz) are served while their tapes are generated
+    for symbol in symbols:
+        if symbol not in latest_state.states:
+            latest_state.track(symbol)
+            await asyncio.sleep(0)
+
+async def warm_up():
+    global ready
+    await track_symbols(MARKET_DATA_SYMBOLS)
+    ready = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ready
+    warm_up_task = asyncio.create_task(warm_up())
+    ticker_task = asyncio.create_task(run_ticker())
+    yield
+    ready = False
+    warm_up_task.cancel()
+    ticker_task.cancel()
+    await asyncio.gather(warm_up_task, ticker_task, return_exceptions=True)
+
+app = FastAPI(lifespan=lifespan)
+if TRAFFIC_RECORD_FILE:
+    from traffic.record import TrafficRecorder
+    app.add_middleware(TrafficRecorder, path=TRAFFIC_RECORD_FILE, service="market_data")
+if PROFILE_DIR:
+    from profiling.middleware import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware, directory=PROFILE_DIR, service="market_data", mode=PROFILE_MODE,
+                       sample_rate=PROFILE_SAMPLE_RATE, sample_interval=PROFILE_SAMPLE_INTERVAL)
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    if not ready:
+        return Response(content=json.dumps({"status": "warming"}), status_code=503, media_type="application/json")
+    return {"status": "ready", "instance": SIMULATOR_INSTANCE} if SIMULATOR_INSTANCE else {"status": "ready"}
+
+def parse_symbols(symbols: str) -> List[str]:
+    return [s.strip().upper() for s in symbols.split(',') if s.strip()]
+
+# --- Quote Endpoint ---
+@app.get("/v2/stocks/quotes/latest")
 async def get_latest_quotes_for_symbols(
     symbols: str = Query(..., description="A comma-separated list of stock symbols, e.g., AAPL,MSFT")
 ):
-    requested_symbols = [s.strip().upper() for s in symbols.split(',')]
-    response_data: Dict[str, Any] = {}
-
-    for sym_ticker in requested_symbols:
-        now_utc = datetime.now(timezone.utc)
-
-        local_bid_price = round(random.uniform(100, 200), 2)
-        local_ask_price = round(local_bid_price + random.uniform(0.01, 0.1), 2)
-        local_ask_size_val = float(random.randint(1, 10) * 100)
-        local_bid_size_val = float(random.randint(1, 10) * 100)
-        possible_exchanges = ["NASDAQ", "NYSE", "ARCA", None]
-        local_ask_exchange_val = random.choice(possible_exchanges)
-        local_bid_exchange_val = random.choice(possible_exchanges)
-        local_conditions_val = random.choice([["R"], ["O", "R"], None])
-        local_timestamp_val = now_utc.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-        local_tape_val = random.choice(["A", "B", "C", None])
-
-        quote_instance = QuoteData(
-            ask_price=local_ask_price,
-            ask_size=local_ask_size_val,
-            ask_exchange=local_ask_exchange_val,
-            bid_price=local_bid_price,
-            bid_size=local_bid_size_val,
-            bid_exchange=local_bid_exchange_val,
-            conditions=local_conditions_val,
-            timestamp=local_timestamp_val,
-            tape=local_tape_val
-        )
-        try:
-            aliased_quote_dict = quote_instance.model_dump(by_alias=True)
-        except AttributeError:
-            aliased_quote_dict = quote_instance.dict(by_alias=True)
-        response_data[sym_ticker] = aliased_quote_dict
-
-    return response_data
-
-# --- Bar Data Models and Endpoint ---
-class BarData(BaseModel):
-    close_price: float = Field(alias="c")
-    high_price: float = Field(alias="h")
-    low_price: float = Field(alias="l")
-    trade_count: Optional[float] = Field(default=None, alias="n") # Changed from Optional[int]
-    open_price: float = Field(alias="o")
-    timestamp: str = Field(alias="t") # Expects ISO 8601 string
-    volume: float = Field(alias="v") # Changed from int
-    vwap: Optional[float] = Field(default=None, alias="vw")
-
-    model_config = {
-        "populate_by_name": True
-    }
-
-class BarsResponse(BaseModel):
-    bars: List[BarData]
-    symbol: str
-    next_page_token: Optional[str] = None
-
-
-@app.get("/v2/stocks/{symbol}/bars", response_model=BarsResponse)
+    # Read from the tick engine's arrays: the ticker advances every symbol's quote in one step
+    body = json.dumps({"quotes": latest_state.latest_quotes(parse_symbols(symbols))})
+    return Response(content=body, media_type="application/json")
+
+# --- Bar Endpoint ---
+def parse_time_range(start_date: Optional[str], end_date: Optional[str]):
+    # Alpaca defaults: from the start of the current day until now
+    try:
+        end = parse_rfc3339(end_date) if end_date else datetime.now(timezone.utc)
+        start = parse_rfc3339(start_date) if start_date else end.replace(hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="invalid start or end")
+    return start, end
+
+def page_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_LIMIT
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=422, detail=f"invalid limit: must be between 1 and {MAX_PAGE_LIMIT}")
+    return limit
+
+def encode_page_token(*parts: Any) -> str:
+    return base64.urlsafe_b64encode(":".join(str(p) for p in parts).encode()).decode()
+
+def decode_page_token(page_token: str) -> List[str]:
+    try:
+        return base64.urlsafe_b64decode(page_token.encode()).decode().split(":")
+    except ValueError:
+        raise HTTPException(status_code=422, detail="invalid page_token")
+
+@app.get("/v2/stocks/{symbol}/bars")
 async def get_historical_bars(
     symbol: str,
     start_date: Optional[str] = Query(None, alias="start"), # Use alias for query params if needed
     end_date: Optional[str] = Query(None, alias="end"),
-    timeframe: Optional[str] = Query(None) # Alpaca uses "timeframe", not StockTimeFrame for query
+    timeframe: Optional[str] = Query(None), # Alpaca uses "timeframe", not StockTimeFrame for query
+    limit: Optional[int] = Query(None),
+    page_token: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    symbol = symbol.upper()
+    start, end = parse_time_range(start_date, end_date)
+    limit = page_limit(limit)
+    if page_token:
+        # The token is the start of the first bar of the next page, in epoch microseconds
+        try:
+            start = micros_to_datetime(int(decode_page_token(page_token)[0]))
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=422, detail="invalid page_token")
+    try:
+        amount, unit = parse_timeframe(timeframe or "1Day")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # Bars are deterministic for a seed once their days are over, so only ranges ending
+    # before today can be cached; the live day is regenerated on every request
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    cache_key = None
+    if end < today_start:
+        cache_key = (market_tape.seed, symbol, datetime_to_micros(start), datetime_to_micros(end),
+                     amount, unit, limit)
+        cached = bar_response_cache.get(cache_key)
+        if cached is not None:
+            body, etag = cached
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    # Uncached days are generated on the event loop; yield after each one so a long first
+    # request does not stall other requests (or the trading app, in the launcher's single mode)
+    for bars in market_tape.bar_steps(symbol, f"{amount}{unit}", start, end, limit=limit + 1):
+        if bars is None:
+            await asyncio.sleep(0)
+        else:
+            break
+    next_page_token = None
+    if len(bars) > limit:
+        next_page_token = encode_page_token(bars[limit][0])
+        bars = bars[:limit]
+
+    # Bars come straight from the tape, so they are serialized without per-bar model validation
+    body = json.dumps({
+        "bars": [bar_to_dict(bar) for bar in bars],
+        "symbol": symbol,
+        "next_page_token": next_page_token,
+    }).encode()
+    etag = bar_response_cache.put(cache_key, body) if cache_key is not None else make_etag(body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {"bars": bar_response_cache.stats()}
+
+# --- Trade Endpoints ---
+def collect_trades(symbols: List[str], start: datetime, end: datetime, limit: int,
+                   page_token: Optional[str]):
+    """Trades for `symbols` (in symbol order, then time order), at most `limit` per page.
+    The page token records where the next page resumes: (symbol, day ordinal, trade index)."""
+    cursor_symbol, cursor = None, None
+    if page_token:
+        try:
+            cursor_symbol, ordinal, index = decode_page_token(page_token)
+            cursor = (int(ordinal), int(index))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="invalid page_token")
+
+    trades: Dict[str, List[Dict[str, Any]]] = {}
+    count = 0
+    for symbol in sorted(set(symbols)):
+        if cursor_symbol is not None and symbol < cursor_symbol:
+            continue
+        symbol_cursor = cursor if symbol == cursor_symbol else None
+        for tape, index in market_tape.trades(symbol, start, end, symbol_cursor):
+            if count == limit:
+                return trades, encode_page_token(symbol, tape.ordinal, index)
+            trades.setdefault(symbol, []).append(tape.trade_to_dict(index))
+            count += 1
+    return trades, None
+
+@app.get("/v2/stocks/trades")
+async def get_historical_trades(
+    symbols: str = Query(..., description="A comma-separated list of stock symbols, e.g., AAPL,MSFT"),
+    start_date: Optional[str] = Query(None, alias="start"),
+    end_date: Optional[str] = Query(None, alias="end"),
+    limit: Optional[int] = Query(None),
+    page_token: Optional[str] = Query(None)
+):
+    start, end = parse_time_range(start_date, end_date)
+    trades, next_page_token = collect_trades(parse_symbols(symbols), start, end, page_limit(limit), page_token)
+    return Response(content=json.dumps({"trades": trades, "next_page_token": next_page_token}),
+                    media_type="application/json")
+
+@app.get("/v2/stocks/trades/latest")
+async def get_latest_trades(
+    symbols: str = Query(..., description="A comma-separated list of stock symbols, e.g., AAPL,MSFT")
+):
+    requested_symbols = parse_symbols(symbols)
+    await track_symbols(requested_symbols)
+    trades = {symbol: latest_state.track(symbol).latest_trade for symbol in requested_symbols}
+    return Response(content=json.dumps({"trades": trades}), media_type="application/json")
+
+@app.get("/v2/stocks/{symbol}/trades")
+async def get_historical_trades_for_symbol(
+    symbol: str,
+    start_date: Optional[str] = Query(None, alias="start"),
+    end_date: Optional[str] = Query(None, alias="end"),
+    limit: Optional[int] = Query(None),
+    page_token: Optional[str] = Query(None)
 ):
-    bars_data: List[BarData] = []
-    # Simulate generating a few bars. In a real scenario, this would depend on start/end/timeframe.
-    num_bars = random.randint(1, 5)
-
-    for i in range(num_bars):
-        # Generate prices ensuring h >= o, h >= c, l <= o, l <= c
-        open_price = round(random.uniform(90,110),2)
-        close_price = round(random.uniform(90,110),2)
-        high_price = round(max(open_price, close_price, random.uniform(open_price, open_price + 10)), 2)
-        low_price = round(min(open_price, close_price, random.uniform(open_price - 10, open_price)), 2)
-
-        # Ensure low is not greater than high (can happen with random generation)
-        if low_price > high_price:
-            low_price = high_price - random.uniform(0.1, 2.0) if high_price > 2.0 else high_price
-
-        bar_ts_iso = datetime.now(timezone.utc).isoformat(timespec='milliseconds') + "Z" # Mock timestamp
-
-        local_volume = float(random.randint(5000, 50000))
-        local_trade_count = float(random.randint(50, 500)) if random.choice([True, False]) else None
-        local_vwap = round(random.uniform(low_price, high_price), 2) if random.choice([True, False]) else None
-
-        bar_instance = BarData(
-            close_price=close_price,
-            high_price=high_price,
-            low_price=low_price,
-            trade_count=local_trade_count,
-            open_price=open_price,
-            timestamp=bar_ts_iso,
-            volume=local_volume,
-            vwap=local_vwap
-        )
-        bars_data.append(bar_instance)
-
-    return BarsResponse(
-        bars=bars_data,
-        symbol=symbol.upper(),
-        next_page_token=None # Can be a string if pagination is implemented
-    )
+    symbol = symbol.upper()
+    start, end = parse_time_range(start_date, end_date)
+    trades, next_page_token = collect_trades([symbol], start, end, page_limit(limit), page_token)
+    body = {"trades": trades.get(symbol, []), "symbol": symbol, "next_page_token": next_page_token}
+    return Response(content=json.dumps(body), media_type="application/json")
+
+# --- Snapshot Endpoints ---
+@app.get("/v2/stocks/snapshots")
+async def get_snapshots(
+    symbols: str = Query(..., description="A comma-separated list of stock symbols, e.g., AAPL,MSFT")
+):
+    requested_symbols = parse_symbols(symbols)
+    await track_symbols(requested_symbols)
+    # Pure read of the latest-state cache; serialized here so the ticker can't interleave
+    body = json.dumps(latest_state.snapshots(requested_symbols))
+    return Response(content=body, media_type="application/json")
+
+@app.get("/v2/stocks/{symbol}/snapshot")
+async def get_snapshot(symbol: str):
+    symbol = symbol.upper()
+    snapshot = {"symbol": symbol}
+    snapshot.update(latest_state.snapshot(symbol))
+    return Response(content=json.dumps(snapshot), media_type="application/json")
 
 if __name__ == "__main__":
     parsed_url = urlparse(MARKET_DATA_SIMULATOR_URL)
@@ -0,0 +1,81 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header (weak comparison, lists and "*" allowed)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """LRU cache of serialized response bodies, bounded by the total size of the bodies.
+
+    Keys are normalized requests; values are (body, etag) so hits and revalidations never
+    re-serialize or re-hash anything.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, str]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> str:
+        etag = make_etag(body)
+        if len(body) > self.max_bytes:
+            return etag  # never cacheable, still gets an ETag
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= len(old[0])
+        self._entries[key] = (body, etag)
+        self.size_bytes += len(body)
+        while self.size_bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+        return etag
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,171 @@
+import heapq
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+from market_data_simulator.factors import MICROS_PER_DAY, UNIX_EPOCH_ORDINAL
+from market_data_simulator.tape import DayTape, MarketTape, bar_to_dict, datetime_to_micros
+from market_data_simulator.ticks import TickEngine
+
+
+class SymbolState:
+    """Latest market state for one symbol, updated in place by the ticker.
+
+    Trades and bars come from the symbol's trade tape: a tick folds the trades printed since
+    the previous tick into the day's bars and only re-serializes what changed. Quotes live in
+    the tick engine's arrays; the state only holds the symbol's row there.
+    """
+
+    __slots__ = ("symbol", "quote_row", "ordinal", "day", "cursor", "latest_trade_us", "latest_trade", "minute_bar",
+                 "daily_bar", "prev_daily_bar")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.quote_row = -1
+        self.ordinal: Optional[int] = None
+        self.day: Optional[DayTape] = None  # held directly so the live day never falls out of the tape's LRU
+        self.cursor = -1
+        self.latest_trade_us = 0
+        self.latest_trade: Optional[Dict[str, Any]] = None
+        self.minute_bar: Optional[Dict[str, Any]] = None
+        self.daily_bar: Optional[Dict[str, Any]] = None
+        self.prev_daily_bar: Optional[Dict[str, Any]] = None
+
+    def tick(self, tape: MarketTape, now_us: int) -> bool:
+        """Fold newly printed trades into the state; returns whether the latest trade changed."""
+        ordinal = now_us // MICROS_PER_DAY + UNIX_EPOCH_ORDINAL
+        prev_day = None
+        if ordinal != self.ordinal:
+            if self.ordinal == ordinal - 1 and self.day is not None:
+                # Rolled over midnight: finish the held day instead of looking it up again
+                prev_day = self.day
+                tape.advance(prev_day, now_us)
+                prev = prev_day.daily_bar()
+            else:
+                prev = tape.daily_bar(self.symbol, ordinal - 1, now_us)
+            self.ordinal = ordinal
+            self.day = tape.day(self.symbol, ordinal, now_us)
+            self.cursor = -1
+            self.prev_daily_bar = bar_to_dict(prev) if prev is not None else None
+        elif self.day is not None:
+            tape.advance(self.day, now_us)
+        day = self.day
+        latest_trade = self.latest_trade
+
+        if day is not None and day.cursor != self.cursor:
+            self.cursor = day.cursor
+            if day.cursor:
+                self.latest_trade = day.trade_to_dict(day.cursor - 1)
+                self.latest_trade_us = day.ts[day.cursor - 1]
+                self.minute_bar = bar_to_dict(day.last_minute_bar())
+                self.daily_bar = bar_to_dict(day.daily_bar())
+            else:
+                # Nothing printed yet today: the latest trade is yesterday's last one
+                if prev_day is None:
+                    prev_day = tape.day(self.symbol, ordinal - 1, now_us)
+                if prev_day is not None and prev_day.cursor:
+                    self.latest_trade = prev_day.trade_to_dict(prev_day.cursor - 1)
+                    self.latest_trade_us = prev_day.ts[prev_day.cursor - 1]
+
+        return self.latest_trade is not latest_trade
+
+    def due_us(self) -> int:
+        """When the state next changes: the next trade on today's tape, or the next midnight."""
+        day = self.day
+        if day is not None and not day.complete:
+            return day.ts[day.cursor]
+        return (self.ordinal + 1 - UNIX_EPOCH_ORDINAL) * MICROS_PER_DAY
+
+    def snapshot(self, engine: TickEngine) -> Dict[str, Any]:
+        return {
+            "latestTrade": self.latest_trade,
+            "latestQuote": engine.quote(self.quote_row),
+            "minuteBar": self.minute_bar,
+            "dailyBar": self.daily_bar,
+            "prevDailyBar": self.prev_daily_bar,
+        }
+
+
+class LatestStateCache:
+    """Per-symbol latest trade/quote/bar state.
+
+    The background ticker keeps every tracked symbol current, so reads (snapshots, latest
+    trades and quotes) never generate or fold data; the first read of a symbol starts tracking
+    it. Symbols wait in a heap keyed on when their state next changes (their next trade, or
+    midnight), so a tick only catches up the symbols that printed since the previous tick and
+    re-anchors their quotes to the new trade. Quotes of all symbols are then advanced together
+    by one TickEngine step, moving with the factor paths the tape is generated from. Symbols
+    that are only ever quoted get a quote row without a trade tape, anchored to the symbol's
+    base price.
+    """
+
+    def __init__(self, tape: MarketTape, seed: int = 0):
+        self.tape = tape
+        self.seed = seed
+        self.states: Dict[str, SymbolState] = {}
+        self.engine = TickEngine(seed, tape.factors)
+        self._due: List[Tuple[int, str]] = []  # (due_us, symbol), one entry per tracked symbol
+
+    def track(self, symbol: str, now: Optional[datetime] = None) -> SymbolState:
+        """The symbol's state, tracking it first if needed."""
+        state = self.states.get(symbol)
+        if state is None:
+            now = now or datetime.now(timezone.utc)
+            now_us = datetime_to_micros(now)
+            state = SymbolState(symbol)
+            state.tick(self.tape, now_us)
+            if state.latest_trade is not None:
+                price, price_us = state.latest_trade["p"], state.latest_trade_us
+            else:
+                price, price_us = self.tape.base_price(symbol), now_us
+            quoted = symbol in self.engine.rows
+            state.quote_row = self.engine.add(symbol, price, now_us, price_us)
+            if quoted:
+                # Was quote-only until now: move the quote to where the symbol trades
+                self.engine.set_reference(state.quote_row, price, price_us, snap=True)
+            self.states[symbol] = state
+            heapq.heappush(self._due, (state.due_us(), symbol))
+        return state
+
+    def track_many(self, symbols: Iterable[str]) -> None:
+        now = datetime.now(timezone.utc)
+        for symbol in symbols:
+            self.track(symbol, now)
+
+    def tick_steps(self, now: Optional[datetime] = None) -> Iterator[None]:
+        """Catch up the symbols due by now, then step every quote. Yields after each symbol
+        that needed a new day tape, so a caller can let other work run at midnight."""
+        now = now or datetime.now(timezone.utc)
+        now_us = datetime_to_micros(now)
+        tape, engine, due = self.tape, self.engine, self._due
+        while due and due[0][0] <= now_us:
+            _, symbol = heapq.heappop(due)
+            state = self.states[symbol]
+            generated = tape.generated_days
+            if state.tick(tape, now_us) and state.latest_trade is not None:
+                engine.set_reference(state.quote_row, state.latest_trade["p"], state.latest_trade_us)
+            heapq.heappush(due, (state.due_us(), symbol))
+            if tape.generated_days != generated:
+                yield None
+        engine.step(now_us)
+
+    def tick_all(self, now: Optional[datetime] = None) -> None:
+        for _ in self.tick_steps(now):
+            pass
+
+    def snapshot(self, symbol: str) -> Dict[str, Any]:
+        return self.track(symbol).snapshot(self.engine)
+
+    def snapshots(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return {symbol: self.track(symbol, now).snapshot(self.engine) for symbol in symbols}
+
+    def latest_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Latest quotes read straight from the engine's arrays; unknown symbols get a quote row."""
+        engine = self.engine
+        rows = list(map(engine.rows.get, symbols))
+        if None in rows:
+            now_us = datetime_to_micros(datetime.now(timezone.utc))
+            for i, symbol in enumerate(symbols):
+                if rows[i] is None:
+                    rows[i] = engine.add(symbol, self.tape.base_price(symbol), now_us)
+        return dict(zip(symbols, engine.quotes(rows)))
@@ -0,0 +1,485 @@
+import math
+import random
+from bisect import bisect_left, bisect_right
+import re
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+
+import numpy as np
+
+from market_data_simulator.factors import (
+    EPOCH,
+    FACTOR_BLOCK_DAYS,
+    IDIOSYNCRATIC_VOLATILITY,
+    FactorPaths,
+    exposure,
+    factor_loadings,
+)
+
+# Sessions are whole UTC days, every day, from EPOCH: the simulated market never closes.
+MICROS_PER_MINUTE = 60_000_000
+MICROS_PER_DAY = 1440 * MICROS_PER_MINUTE
+MEAN_REVERSION = 0.01
+# Daily closes are generated in the factor model's blocks of days. The walk's memory decays by
+# (1 - MEAN_REVERSION) ** CLOSE_BLOCK_DAYS (~3e-5) over a block, so a block starts from the end
+# of its predecessor walked from the mean, and any day's close costs O(1) blocks.
+CLOSE_BLOCK_DAYS = FACTOR_BLOCK_DAYS
+MAX_CACHED_CLOSE_BLOCKS = 4096
+# Completed daily bars kept in an LRU; at about 500 bytes each this bounds them to ~64 MB,
+# ten years of daily bars for some 35 symbols
+MAX_CACHED_DAILY_BARS = 131072
+_CLOSE_DECAY = (1 - MEAN_REVERSION) ** np.arange(1, CLOSE_BLOCK_DAYS + 1)
+
+TRADE_EXCHANGES = ("V", "Q", "N", "P", "K", "Z")
+TRADE_TAPES = {"V": "C", "Q": "C", "N": "A", "P": "B", "K": "B", "Z": "B"}
+TRADE_SIZES = (1, 5, 10, 25, 50, 100, 100, 100, 200, 300, 500)
+
+# (o, h, l, c, v, n, vw) keyed by bar start in epoch microseconds
+Bar = Tuple[int, float, float, float, float, float, int, float]
+
+_TIMEFRAME_RE = re.compile(r"^(\d+)(Min|T|Hour|H|Day|D|Week|W|Month|M)$")
+_TIMEFRAME_UNITS = {"Min": "Min", "T": "Min", "Hour": "Hour", "H": "Hour", "Day": "Day", "D": "Day",
+                    "Week": "Week", "W": "Week", "Month": "Month", "M": "Month"}
+
+
+def parse_timeframe(timeframe: Optional[str]) -> Tuple[int, str]:
+    """Parse an Alpaca timeframe string ("1Min", "15Min", "1Hour", "1Day", "1Week", "3Month")."""
+    match = _TIMEFRAME_RE.match(timeframe or "1Day")
+    if not match:
+        raise ValueError(f"invalid timeframe: {timeframe}")
+    amount, unit = int(match.group(1)), _TIMEFRAME_UNITS[match.group(2)]
+    valid = {"Min": 1 <= amount <= 59, "Hour": 1 <= amount <= 23, "Day": amount == 1,
+             "Week": amount == 1, "Month": amount in (1, 2, 3, 4, 6, 12)}[unit]
+    if not valid:
+        raise ValueError(f"invalid timeframe: {timeframe}")
+    return amount, unit
+
+
+def micros_to_datetime(micros: int) -> datetime:
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=micros)
+
+
+def micros_to_rfc3339(micros: int) -> str:
+    return micros_to_datetime(micros).isoformat(timespec='microseconds').replace('+00:00', 'Z')
+
+
+def datetime_to_micros(ts: datetime) -> int:
+    return (ts - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+
+def parse_rfc3339(value: str) -> datetime:
+    """Parse an RFC-3339 timestamp or a YYYY-MM-DD date (taken as UTC midnight)."""
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def bar_to_dict(bar: Bar) -> Dict[str, Any]:
+    return {"t": micros_to_rfc3339(bar[0]), "o": bar[1], "h": bar[2], "l": bar[3], "c": bar[4],
+            "v": bar[5], "n": bar[6], "vw": bar[7]}
+
+
+def _merge_bars(start: int, bars: List[Bar]) -> Bar:
+    volume = sum(b[5] for b in bars)
+    notional = sum(b[5] * b[7] for b in bars)
+    return (start, bars[0][1], max(b[2] for b in bars), min(b[3] for b in bars), bars[-1][4],
+            volume, sum(b[6] for b in bars), round(notional / volume, 4) if volume else bars[-1][4])
+
+
+class DayTape:
+    """One symbol's trades for one UTC day, stored column-wise, plus the 1Min bars folded from
+    them. `advance` folds newly visible trades into the bars incrementally, so the live day is
+    aggregated as time passes and completed days are aggregated exactly once."""
+
+    __slots__ = ("symbol", "ordinal", "start_us", "ts", "price", "size", "exchange", "cursor",
+                 "bar_minute", "bar_open", "bar_high", "bar_low", "bar_close", "bar_volume",
+                 "bar_count", "bar_notional", "day_high", "day_low", "day_volume", "day_count",
+                 "day_notional", "rollups", "day_bar")
+
+    def __init__(self, symbol: str, ordinal: int, ts: array, price: array, size: array, exchange: array):
+        self.symbol = symbol
+        self.ordinal = ordinal
+        self.start_us = (ordinal - date(1970, 1, 1).toordinal()) * MICROS_PER_DAY
+        self.ts = ts
+        self.price = price
+        self.size = size
+        self.exchange = exchange
+        self.cursor = 0  # trades before the cursor are folded into the bars
+        self.bar_minute = array("H")
+        self.bar_open = array("d")
+        self.bar_high = array("d")
+        self.bar_low = array("d")
+        self.bar_close = array("d")
+        self.bar_volume = array("d")
+        self.bar_count = array("I")
+        self.bar_notional = array("d")
+        # Running totals for the day so far, so the live daily bar is O(1)
+        self.day_high = 0.0
+        self.day_low = math.inf
+        self.day_volume = 0.0
+        self.day_count = 0
+        self.day_notional = 0.0
+        # Intraday rollups (minutes per bar -> bars) and the daily bar, once the day is complete
+        self.rollups: Dict[int, List[Bar]] = {}
+        self.day_bar: Optional[Bar] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.cursor == len(self.ts)
+
+    def advance(self, until_us: int) -> int:
+        """Fold trades with a timestamp <= until_us into the 1Min bars; returns how many were folded."""
+        begin = self.cursor
+        end = bisect_right(self.ts, until_us, begin)
+        if end == begin:
+            return 0
+        ts, price, size = self.ts, self.price, self.size
+        start_us = self.start_us
+        bar_minute = self.bar_minute
+        # The open bar is carried in locals and flushed to the columns when its minute ends
+        if bar_minute and bar_minute[-1] == (ts[begin] - start_us) // MICROS_PER_MINUTE:
+            minute = bar_minute.pop()
+            o, h, l, c = self.bar_open.pop(), self.bar_high.pop(), self.bar_low.pop(), self.bar_close.pop()
+            v, k, pv = self.bar_volume.pop(), self.bar_count.pop(), self.bar_notional.pop()
+        else:
+            minute = -1
+            o = h = l = c = v = pv = 0.0
+            k = 0
+        day_high, day_low = self.day_high, self.day_low
+        day_volume, day_notional = self.day_volume, self.day_notional
+        for i in range(begin, end):
+            m = (ts[i] - start_us) // MICROS_PER_MINUTE
+            p = price[i]
+            s = size[i]
+            if m != minute:
+                if k:
+                    self._append_bar(minute, o, h, l, c, v, k, pv)
+                minute = m
+                o = h = l = p
+                v = pv = 0.0
+                k = 0
+            elif p > h:
+                h = p
+            elif p < l:
+                l = p
+            c = p
+            v += s
+            pv += p * s
+            k += 1
+            if p > day_high:
+                day_high = p
+            if p < day_low:
+                day_low = p
+            day_volume += s
+            day_notional += p * s
+        self._append_bar(minute, o, h, l, c, v, k, pv)
+        self.day_high, self.day_low = day_high, day_low
+        self.day_volume, self.day_notional = day_volume, day_notional
+        self.day_count += end - begin
+        self.cursor = end
+        return end - begin
+
+    def _append_bar(self, minute: int, o: float, h: float, l: float, c: float, v: float, k: int, pv: float) -> None:
+        self.bar_minute.append(minute)
+        self.bar_open.append(o)
+        self.bar_high.append(h)
+        self.bar_low.append(l)
+        self.bar_close.append(c)
+        self.bar_volume.append(v)
+        self.bar_count.append(k)
+        self.bar_notional.append(pv)
+
+    def minute_bar(self, index: int) -> Bar:
+        volume = self.bar_volume[index]
+        return (self.start_us + self.bar_minute[index] * MICROS_PER_MINUTE, self.bar_open[index],
+                self.bar_high[index], self.bar_low[index], self.bar_close[index], volume,
+                self.bar_count[index], round(self.bar_notional[index] / volume, 4))
+
+    def bars(self, minutes: int) -> List[Bar]:
+        """Bars of `minutes` length rolled up from the 1Min bars folded so far."""
+        cached = self.rollups.get(minutes)
+        if cached is not None:
+            return cached
+        bars = [self.minute_bar(i) for i in range(len(self.bar_minute))]
+        if minutes > 1 and bars:
+            bucket_us = minutes * MICROS_PER_MINUTE
+            rolled: List[Bar] = []
+            group: List[Bar] = []
+            group_start = None
+            for bar in bars:
+                start = self.start_us + (bar[0] - self.start_us) // bucket_us * bucket_us
+                if start != group_start and group:
+                    rolled.append(_merge_bars(group_start, group))
+                    group = []
+                group_start = start
+                group.append(bar)
+            rolled.append(_merge_bars(group_start, group))
+            bars = rolled
+        # 1Min bars are rebuilt from the columns; coarser rollups of a finished day are kept
+        if self.complete and minutes > 1:
+            self.rollups[minutes] = bars
+        return bars
+
+    def daily_bar(self) -> Optional[Bar]:
+        if self.day_bar is not None:
+            return self.day_bar
+        if not self.bar_minute:
+            return None
+        bar = (self.start_us, self.bar_open[0], self.day_high, self.day_low, self.bar_close[-1],
+               self.day_volume, self.day_count, round(self.day_notional / self.day_volume, 4))
+        if self.complete:
+            self.day_bar = bar
+        return bar
+
+    def last_minute_bar(self) -> Optional[Bar]:
+        return self.minute_bar(len(self.bar_minute) - 1) if self.bar_minute else None
+
+    def trade_to_dict(self, index: int) -> Dict[str, Any]:
+        exchange = TRADE_EXCHANGES[self.exchange[index]]
+        return {
+            "t": micros_to_rfc3339(self.ts[index]),
+            "x": exchange,
+            "p": self.price[index],
+            "s": self.size[index],
+            "c": ["@"],
+            "i": (self.ordinal - EPOCH.toordinal()) * 1_000_000 + index,
+            "z": TRADE_TAPES[exchange],
+        }
+
+
+class MarketTape:
+    """Deterministic trade tape for every symbol, generated one (symbol, day) at a time.
+
+    A day's trades depend only on (seed, symbol, day), and each day opens at the previous
+    day's close, so any range can be generated independently and reproducibly. Day tapes
+    and completed daily bars are kept in bounded LRUs, so daily and longer timeframes cost
+    O(days) once the days have been aggregated.
+    """
+
+    def __init__(self, seed: int = 0, trades_per_day: int = 2000, max_cached_days: int = 512):
+        self.seed = seed
+        self.factors = FactorPaths(seed)
+        self._loadings: Dict[str, Tuple[float, int, float, float, float]] = {}
+        self.trades_per_day = trades_per_day
+        self.max_cached_days = max_cached_days
+        self._days: "OrderedDict[Tuple[str, int], DayTape]" = OrderedDict()
+        self._daily_bars: "OrderedDict[Tuple[str, int], Bar]" = OrderedDict()
+        self.generated_days = 0  # day tapes generated so far, so callers can tell cache misses
+        self._base_prices: Dict[str, float] = {}
+        self._close_blocks: "OrderedDict[Tuple[str, int], List[float]]" = OrderedDict()
+
+    def base_price(self, symbol: str) -> float:
+        """The price a symbol's daily closes revert to; cheap, as no tape is generated."""
+        price = self._base_prices.get(symbol)
+        if price is None:
+            price = round(random.Random(f"{self.seed}:{symbol}:closes").uniform(20, 500), 2)
+            self._base_prices[symbol] = price
+        return price
+
+    def loadings(self, symbol: str) -> Tuple[float, int, float, float, float]:
+        loadings = self._loadings.get(symbol)
+        if loadings is None:
+            loadings = self._loadings[symbol] = factor_loadings(self.seed, symbol)
+        return loadings
+
+    def _close_walk(self, symbol: str, block: int, start: float) -> np.ndarray:
+        # Log distance from the base price over one block: x[t] = (1 - MEAN_REVERSION) * x[t-1] + shock[t],
+        # solved in closed form as decay[t] * (start + cumsum(shock / decay)). A day's shock is the
+        # symbol's exposure to that day's market and sector shocks plus its own noise.
+        beta, sector, gamma, idio, _ = self.loadings(symbol)
+        rng = np.random.default_rng([self.seed & 0xFFFFFFFF, zlib.crc32(symbol.encode()), 0, block])
+        shocks = exposure(self.factors.daily_shocks(block), beta, sector, gamma)
+        shocks += rng.standard_normal(CLOSE_BLOCK_DAYS) * (idio * IDIOSYNCRATIC_VOLATILITY)
+        return _CLOSE_DECAY * (start + np.cumsum(shocks / _CLOSE_DECAY))
+
+    def _close(self, symbol: str, ordinal: int) -> float:
+        # Daily closing prices from EPOCH: a log random walk mean-reverting to the symbol's base
+        # price, so prices stay in a plausible range however far from EPOCH a request lands
+        day = ordinal - EPOCH.toordinal()
+        if day < 0:
+            return self.base_price(symbol)
+        block, offset = divmod(day, CLOSE_BLOCK_DAYS)
+        key = (symbol, block)
+        closes = self._close_blocks.get(key)
+        if closes is None:
+            start = self._close_walk(symbol, block - 1, 0.0)[-1] if block else 0.0
+            walk = self._close_walk(symbol, block, start)
+            closes = np.maximum(0.01, np.round(self.base_price(symbol) * np.exp(walk), 2)).tolist()
+            self._close_blocks[key] = closes
+            if len(self._close_blocks) > MAX_CACHED_CLOSE_BLOCKS:
+                self._close_blocks.popitem(last=False)
+        else:
+            self._close_blocks.move_to_end(key)
+        return closes[offset]
+
+    def _generate(self, symbol: str, ordinal: int) -> DayTape:
+        rng = np.random.default_rng([self.seed & 0xFFFFFFFF, zlib.crc32(symbol.encode()), 1, ordinal])
+        open_price = self._close(symbol, ordinal - 1)
+        close_price = self._close(symbol, ordinal)
+        n = max(1, int(self.trades_per_day * rng.uniform(0.8, 1.2)))
+        start_us = (ordinal - date(1970, 1, 1).toordinal()) * MICROS_PER_DAY
+        ts = np.sort(start_us + (rng.random(n) * MICROS_PER_DAY).astype(np.int64))
+
+        # Log price: the symbol's exposure to the day's market and sector paths since the open,
+        # plus its own random walk with uniform steps of the right variance, bridged so the last
+        # trade prints exactly at the day's close
+        beta, sector, gamma, idio, _ = self.loadings(symbol)
+        walk = exposure(self.factors.levels(ordinal, ts) - self.factors.day_levels(ordinal)[0], beta, sector, gamma)
+        step = 2 * math.sqrt(3) * idio * IDIOSYNCRATIC_VOLATILITY / math.sqrt(n)
+        walk += np.cumsum((rng.random(n) - 0.5) * step)
+        drift = (math.log(close_price / open_price) - walk[-1]) / n
+        price = np.maximum(0.01, np.round(open_price * np.exp(walk + drift * np.arange(1, n + 1)), 2))
+        price[-1] = close_price
+
+        size = np.asarray(TRADE_SIZES)[rng.integers(0, len(TRADE_SIZES), n)]
+        exchange = rng.integers(0, len(TRADE_EXCHANGES), n)
+        return DayTape(symbol, ordinal, array("q", ts.tolist()), array("d", price.tolist()),
+                       array("I", size.tolist()), array("B", exchange.tolist()))
+
+    def day(self, symbol: str, ordinal: int, now_us: Optional[int] = None) -> Optional[DayTape]:
+        """The symbol's tape for a day, with every trade up to `now_us` folded into its bars.
+        Returns None for days before EPOCH or in the future."""
+        if now_us is None:
+            now_us = datetime_to_micros(datetime.now(timezone.utc))
+        day_start_us = (ordinal - date(1970, 1, 1).toordinal()) * MICROS_PER_DAY
+        if ordinal <= EPOCH.toordinal() or day_start_us > now_us:
+            return None
+        key = (symbol, ordinal)
+        tape = self._days.get(key)
+        if tape is None:
+            tape = self._generate(symbol, ordinal)
+            self.generated_days += 1
+            self._days[key] = tape
+            if len(self._days) > self.max_cached_days:
+                self._days.popitem(last=False)
+        else:
+            self._days.move_to_end(key)
+        self.advance(tape, now_us)
+        return tape
+
+    def advance(self, tape: DayTape, now_us: int) -> None:
+        """Fold a day's trades up to `now_us` into its bars, keeping its daily bar once complete."""
+        if not tape.complete:
+            tape.advance(now_us)
+            if tape.complete:
+                daily = tape.daily_bar()
+                if daily is not None:
+                    self._daily_bars[(tape.symbol, tape.ordinal)] = daily
+                    if len(self._daily_bars) > MAX_CACHED_DAILY_BARS:
+                        self._daily_bars.popitem(last=False)
+
+    def daily_bar(self, symbol: str, ordinal: int, now_us: Optional[int] = None) -> Optional[Bar]:
+        key = (symbol, ordinal)
+        bar = self._daily_bars.get(key)
+        if bar is not None:
+            self._daily_bars.move_to_end(key)
+            return bar
+        tape = self.day(symbol, ordinal, now_us)
+        return tape.daily_bar() if tape is not None else None
+
+    def bars(self, symbol: str, timeframe: str, start: datetime, end: datetime,
+             limit: Optional[int] = None) -> List[Bar]:
+        """Bars with start time in [start, end], rolled up from 1Min bars (intraday) or daily bars.
+        With `limit`, stops once that many bars have been collected."""
+        for result in self.bar_steps(symbol, timeframe, start, end, limit):
+            if result is not None:
+                return result
+        return []
+
+    def bar_steps(self, symbol: str, timeframe: str, start: datetime, end: datetime,
+                  limit: Optional[int] = None) -> Iterator[Optional[List[Bar]]]:
+        """bars() as a generator: yields None after each day tape it had to generate, so an
+        async caller can let other work run in between, then yields the bars."""
+        amount, unit = parse_timeframe(timeframe)
+        generated = self.generated_days
+        now_us = datetime_to_micros(datetime.now(timezone.utc))
+        start_us = datetime_to_micros(start)
+        end_us = datetime_to_micros(end)
+        first_day = start.date().toordinal()
+        last_day = end.date().toordinal()
+
+        if unit in ("Min", "Hour"):
+            minutes = amount * (60 if unit == "Hour" else 1)
+            result: List[Bar] = []
+            for ordinal in range(first_day, last_day + 1):
+                tape = self.day(symbol, ordinal, now_us)
+                if tape is not None:
+                    result.extend(bar for bar in tape.bars(minutes) if start_us <= bar[0] <= end_us)
+                if limit is not None and len(result) >= limit:
+                    yield result[:limit]
+                    return
+                if self.generated_days != generated:
+                    generated = self.generated_days
+                    yield None
+            yield result
+            return
+
+        if unit == "Day":
+            result = []
+            for ordinal in range(first_day, last_day + 1):
+                bar = self.daily_bar(symbol, ordinal, now_us)
+                if bar is not None and start_us <= bar[0] <= end_us:
+                    result.append(bar)
+                    if limit is not None and len(result) >= limit:
+                        break
+                if self.generated_days != generated:
+                    generated = self.generated_days
+                    yield None
+            yield result
+            return
+
+        # Weeks start on Monday, months are grouped in `amount`-month blocks from January
+        if unit == "Week":
+            first_day -= date.fromordinal(first_day).weekday()
+        else:
+            first = date.fromordinal(first_day)
+            first_day = date(first.year, (first.month - 1) // amount * amount + 1, 1).toordinal()
+        groups: "OrderedDict[int, List[Bar]]" = OrderedDict()
+        for ordinal in range(first_day, last_day + 1):
+            bar = self.daily_bar(symbol, ordinal, now_us)
+            if self.generated_days != generated:
+                generated = self.generated_days
+                yield None
+            if bar is None:
+                continue
+            day = date.fromordinal(ordinal)
+            if unit == "Week":
+                group_day = day - timedelta(days=day.weekday())
+            else:
+                group_day = date(day.year, (day.month - 1) // amount * amount + 1, 1)
+            groups.setdefault(group_day.toordinal(), []).append(bar)
+        result = []
+        for group_ordinal, group in groups.items():
+            group_start_us = (group_ordinal - date(1970, 1, 1).toordinal()) * MICROS_PER_DAY
+            if start_us <= group_start_us <= end_us:
+                result.append(_merge_bars(group_start_us, group))
+        yield result[:limit] if limit is not None else result
+
+    def trades(self, symbol: str, start: datetime, end: datetime,
+               cursor: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[DayTape, int]]:
+        """Iterate (day tape, trade index) for trades in [start, end], optionally resuming at a
+        (day ordinal, index) cursor. Only trades up to now are visible."""
+        now_us = datetime_to_micros(datetime.now(timezone.utc))
+        start_us = datetime_to_micros(start)
+        end_us = min(datetime_to_micros(end), now_us)
+        first_day = start.date().toordinal()
+        if cursor is not None:
+            first_day = max(first_day, cursor[0])
+        for ordinal in range(first_day, end.date().toordinal() + 1):
+            tape = self.day(symbol, ordinal, now_us)
+            if tape is None:
+                continue
+            ts = tape.ts
+            index = bisect_left(ts, start_us)
+            if cursor is not None and cursor[0] == ordinal:
+                index = max(index, cursor[1])
+            for i in range(index, tape.cursor):
+                t = ts[i]
+                if t > end_us:
+                    return
+                if t >= start_us:
+                    yield tape, i
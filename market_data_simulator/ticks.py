@@ -0,0 +1,181 @@
+import math
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from market_data_simulator.factors import (
+    IDIOSYNCRATIC_VOLATILITY,
+    MARKET_VOLATILITY,
+    SECTOR_VOLATILITY,
+    FactorPaths,
+    exposure,
+    factor_loadings,
+)
+from market_data_simulator.tape import micros_to_rfc3339
+
+QUOTE_EXCHANGES = ("V", "Q", "N", "P", "K", "Z")
+QUOTE_CONDITIONS = ["R"]
+QUOTE_TAPE = "C"
+
+SECONDS_PER_DAY = 86400.0
+# Share of a quote's own deviation from its symbol's price path that decays per second
+DEVIATION_DECAY = 0.05
+
+
+class TickEngine:
+    """Latest quotes of every tracked symbol, held in contiguous NumPy columns (one row per
+    symbol) and advanced for all symbols at once.
+
+    A symbol's log mid is its reference price (the last trade from its tape) moved by the
+    symbol's exposure to the market and sector factor paths since that trade, the same paths
+    its tape is generated from, plus a small mean-reverting deviation of its own. Quotes
+    therefore co-move the way the factor model says they should, and stay on their trades.
+    Bid/ask are the mid +/- a per-symbol half spread, rounded out to the cent. Readers look a
+    symbol's row up once and index the columns, so a step never builds Python objects.
+    """
+
+    def __init__(self, seed: int = 0, factors: FactorPaths = None, capacity: int = 1024):
+        self.seed = seed
+        self.factors = factors if factors is not None else FactorPaths(seed)
+        self.rng = np.random.default_rng(seed)
+        self.rows: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.n = 0
+        self.last_step_us = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        def grow(name: str, dtype) -> np.ndarray:
+            column = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                column[:self.n] = old[:self.n]
+            return column
+
+        self.capacity = capacity
+        # Model parameters
+        self.log_ref = grow("log_ref", np.float64)
+        self.exposure_ref = grow("exposure_ref", np.float64)  # factor exposure at the reference trade
+        self.beta = grow("beta", np.float64)
+        self.sector = grow("sector", np.intp)
+        self.gamma = grow("gamma", np.float64)
+        self.idio = grow("idio", np.float64)
+        self.half_spread = grow("half_spread", np.float64)  # fraction of the mid
+        self.deviation = grow("deviation", np.float64)  # own log deviation from the symbol's path
+        # State, overwritten by every step
+        self.log_mid = grow("log_mid", np.float64)
+        self.bid = grow("bid", np.float64)
+        self.ask = grow("ask", np.float64)
+        self.bid_size = grow("bid_size", np.int64)
+        self.ask_size = grow("ask_size", np.int64)
+        self.bid_exchange = grow("bid_exchange", np.int64)
+        self.ask_exchange = grow("ask_exchange", np.int64)
+        # Scratch space, so a step allocates nothing
+        self._shock = np.zeros(capacity)
+        self._work = np.zeros(capacity)
+
+    def add(self, symbol: str, reference_price: float, now_us: int, reference_us: Optional[int] = None) -> int:
+        """A symbol's row, added anchored to a trade at `reference_us` (default: now) if new."""
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+        if self.n == self.capacity:
+            self._allocate(self.capacity * 2)
+        row = self.n
+        beta, sector, gamma, idio, spread_bps = factor_loadings(self.seed, symbol)
+        self.beta[row], self.sector[row], self.gamma[row], self.idio[row] = beta, sector, gamma, idio
+        self.half_spread[row] = spread_bps / 10000
+        self.rows[symbol] = row
+        self.symbols.append(symbol)
+        self.n += 1
+        if not self.last_step_us:
+            self.last_step_us = now_us
+        self.set_reference(row, reference_price, reference_us or now_us, snap=True)
+        self.bid_size[row], self.ask_size[row] = self.rng.integers(1, 11, 2)
+        self.bid_exchange[row], self.ask_exchange[row] = self.rng.integers(0, len(QUOTE_EXCHANGES), 2)
+        return row
+
+    def _exposure(self, row: int, levels: np.ndarray) -> float:
+        return float(exposure(levels, self.beta[row], int(self.sector[row]), self.gamma[row]))
+
+    def set_reference(self, row: int, price: float, at_us: int, snap: bool = False) -> None:
+        """Anchor a row to a trade at `at_us`; with `snap`, requote it now without any deviation."""
+        self.log_ref[row] = math.log(price)
+        self.exposure_ref[row] = self._exposure(row, self.factors.level(at_us))
+        if snap:
+            self.deviation[row] = 0.0
+            now_us = self.last_step_us
+            self.log_mid[row] = self.log_ref[row] + self._exposure(row, self.factors.level(now_us)) - self.exposure_ref[row]
+            self._quote_rows(slice(row, row + 1), self.log_mid[row:row + 1])
+
+    def step(self, now_us: int) -> None:
+        """Advance every symbol to now_us in one vectorized update."""
+        n = self.n
+        dt = (now_us - self.last_step_us) / 1e6 if self.last_step_us else 0.0
+        self.last_step_us = now_us
+        if not n or dt <= 0:
+            return
+        scale = math.sqrt(dt / SECONDS_PER_DAY)
+        levels = self.factors.level(now_us)
+        shock, work = self._shock[:n], self._work[:n]
+
+        # Own deviation: decays towards the symbol's path, plus idiosyncratic noise
+        deviation = self.deviation[:n]
+        deviation *= max(0.0, 1.0 - DEVIATION_DECAY * dt)
+        self.rng.standard_normal(out=shock)
+        shock *= self.idio[:n]
+        shock *= IDIOSYNCRATIC_VOLATILITY * scale
+        deviation += shock
+
+        # log mid = log reference + exposure now - exposure at the reference trade + deviation
+        log_mid = self.log_mid[:n]
+        np.multiply(self.beta[:n], levels[0] * MARKET_VOLATILITY, out=log_mid)
+        np.take(levels[1:] * SECTOR_VOLATILITY, self.sector[:n], out=work)
+        work *= self.gamma[:n]
+        log_mid += work
+        log_mid -= self.exposure_ref[:n]
+        log_mid += self.log_ref[:n]
+        log_mid += deviation
+        self._quote_rows(slice(0, n), log_mid)
+
+        exchanges = len(QUOTE_EXCHANGES)
+        self.bid_size[:n] = self.rng.integers(1, 11, n)
+        self.ask_size[:n] = self.rng.integers(1, 11, n)
+        self.bid_exchange[:n] = self.rng.integers(0, exchanges, n)
+        self.ask_exchange[:n] = self.rng.integers(0, exchanges, n)
+
+    def _quote_rows(self, rows: slice, log_mid: np.ndarray) -> None:
+        # bid/ask = mid -/+ half spread, rounded outwards to the cent, at least a cent apart
+        mid = self._work[rows]
+        np.exp(log_mid, out=mid)
+        half = self._shock[rows]
+        np.multiply(mid, self.half_spread[rows], out=half)
+        np.maximum(half, 0.005, out=half)
+        bid, ask = self.bid[rows], self.ask[rows]
+        np.subtract(mid, half, out=bid)
+        np.add(mid, half, out=ask)
+        bid *= 100
+        ask *= 100
+        np.floor(bid, out=bid)
+        np.ceil(ask, out=ask)
+        np.maximum(bid, 1, out=bid)
+        bid += 1
+        np.maximum(ask, bid, out=ask)
+        bid -= 1
+        bid /= 100
+        ask /= 100
+
+    def quote(self, row: int) -> Dict[str, Any]:
+        return self.quotes([row])[0]
+
+    def quotes(self, rows: List[int]) -> List[Dict[str, Any]]:
+        """Alpaca-format latest quotes for the given rows."""
+        index = np.asarray(rows, dtype=np.intp)
+        t = micros_to_rfc3339(self.last_step_us)
+        return [
+            {"t": t, "ax": QUOTE_EXCHANGES[ax], "ap": ap, "as": asz, "bx": QUOTE_EXCHANGES[bx], "bp": bp,
+             "bs": bsz, "c": QUOTE_CONDITIONS, "z": QUOTE_TAPE}
+            for ap, asz, ax, bp, bsz, bx in zip(
+                self.ask[index].tolist(), self.ask_size[index].tolist(), self.ask_exchange[index].tolist(),
+                self.bid[index].tolist(), self.bid_size[index].tolist(), self.bid_exchange[index].tolist())
+        ]
@@ -0,0 +1,163 @@
+import sys
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterable
+
+ACTIVITY_TYPES = ("FILL", "CSD", "CSW", "DIV", "FEE", "INT", "JNLC", "JNLS", "MA", "NC", "SPIN", "REORG")
+ACTIVITY_CODES = {name: code for code, name in enumerate(ACTIVITY_TYPES)}
+SIDES = ("", "buy", "sell")
+ORDER_STATUSES = ("", "filled", "partially_filled")
+
+
+class ActivityLedger:
+    """Append-only account activity ledger stored column-wise.
+
+    Each activity is a row spread over typed arrays (about 70 bytes per fill, no per-row
+    objects). Timestamps never decrease, so time filters are binary searches, and rows are
+    only turned into dicts for the page being returned. An activity id encodes its row, so
+    page tokens resume in O(1).
+    """
+
+    def __init__(self, account_id: str):
+        self.account_id = account_id
+        self.kind = array("B")
+        self.ts = array("q")            # epoch microseconds, non-decreasing
+        self.symbol = array("I")        # index into self.symbols, 0 = no symbol
+        self.side = array("B")          # index into SIDES
+        self.qty = array("d")
+        self.price = array("d")
+        self.net_amount = array("d")
+        self.cum_qty = array("d")
+        self.leaves_qty = array("d")
+        self.order_status = array("B")  # index into ORDER_STATUSES
+        self.order_ids = bytearray()    # 16 bytes per row, zeros when there is no order
+        self.symbols: List[str] = [""]
+        self._symbol_codes: Dict[str, int] = {"": 0}
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def _symbol_code(self, symbol: Optional[str]) -> int:
+        if not symbol:
+            return 0
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            self.symbols.append(sys.intern(symbol))
+            self._symbol_codes[symbol] = code
+        return code
+
+    def _append(self, kind: str, symbol: Optional[str], side: str, qty: float, price: float,
+                net_amount: float, cum_qty: float, leaves_qty: float, order_status: str,
+                order_id: Optional[str], now_us: Optional[int]) -> int:
+        now_us = now_us if now_us is not None else time.time_ns() // 1000
+        if self.ts and now_us < self.ts[-1]:
+            now_us = self.ts[-1]  # keep the time column sorted
+        self.kind.append(ACTIVITY_CODES[kind])
+        self.ts.append(now_us)
+        self.symbol.append(self._symbol_code(symbol))
+        self.side.append(SIDES.index(side))
+        self.qty.append(qty)
+        self.price.append(price)
+        self.net_amount.append(net_amount)
+        self.cum_qty.append(cum_qty)
+        self.leaves_qty.append(leaves_qty)
+        self.order_status.append(ORDER_STATUSES.index(order_status))
+        self.order_ids += uuid.UUID(order_id).bytes if order_id else bytes(16)
+        return len(self.kind) - 1
+
+    def record_fill(self, order_id: str, symbol: str, side: str, qty: float, price: float,
+                    cum_qty: float, leaves_qty: float, now_us: Optional[int] = None) -> int:
+        net_amount = -qty * price if side == "buy" else qty * price
+        status = "filled" if leaves_qty == 0 else "partially_filled"
+        return self._append("FILL", symbol, side, qty, price, net_amount, cum_qty, leaves_qty, status,
+                            order_id, now_us)
+
+    def record_cash(self, kind: str, net_amount: float, symbol: Optional[str] = None, qty: float = 0.0,
+                    per_share_amount: float = 0.0, now_us: Optional[int] = None) -> int:
+        """Record a non-trade activity (deposit, withdrawal, dividend, fee, ...)."""
+        if kind == "FILL" or kind not in ACTIVITY_CODES:
+            raise ValueError(f"invalid non-trade activity type: {kind}")
+        return self._append(kind, symbol, "", qty, per_share_amount, net_amount, 0.0, 0.0, "", None, now_us)
+
+    @staticmethod
+    def activity_id(ts_us: int, row: int) -> str:
+        # Alpaca-style "<yyyymmddhhmmssmmm>::<uuid>", the uuid carrying the row number
+        ts = datetime.fromtimestamp(ts_us / 1_000_000, tz=timezone.utc)
+        return f"{ts.strftime('%Y%m%d%H%M%S')}{ts.microsecond // 1000:03d}::{uuid.UUID(int=row)}"
+
+    @staticmethod
+    def row_from_id(activity_id: str) -> int:
+        try:
+            return uuid.UUID(activity_id.split("::", 1)[1]).int
+        except (IndexError, ValueError):
+            raise ValueError(f"invalid page_token: {activity_id}")
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        kind = ACTIVITY_TYPES[self.kind[row]]
+        ts_us = self.ts[row]
+        symbol = self.symbols[self.symbol[row]] or None
+        activity = {
+            "id": self.activity_id(ts_us, row),
+            "account_id": self.account_id,
+            "activity_type": kind,
+        }
+        if kind == "FILL":
+            activity.update({
+                "transaction_time": datetime.fromtimestamp(ts_us / 1_000_000, tz=timezone.utc)
+                    .isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+                "type": "fill" if self.order_status[row] == 1 else "partial_fill",
+                "price": str(self.price[row]),
+                "qty": str(self.qty[row]),
+                "side": SIDES[self.side[row]],
+                "symbol": symbol,
+                "leaves_qty": str(self.leaves_qty[row]),
+                "order_id": str(uuid.UUID(bytes=bytes(self.order_ids[16 * row:16 * row + 16]))),
+                "cum_qty": str(self.cum_qty[row]),
+                "order_status": ORDER_STATUSES[self.order_status[row]],
+            })
+        else:
+            activity.update({
+                "date": datetime.fromtimestamp(ts_us / 1_000_000, tz=timezone.utc).date().isoformat(),
+                "net_amount": str(self.net_amount[row]),
+                "description": "",
+                "status": "executed",
+            })
+            if symbol:
+                activity.update({"symbol": symbol, "qty": str(self.qty[row]),
+                                 "per_share_amount": str(self.price[row])})
+        return activity
+
+    def query(self, activity_types: Optional[Iterable[str]] = None, after_us: Optional[int] = None,
+              until_us: Optional[int] = None, direction: str = "desc", page_size: int = 100,
+              page_token: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One page of activities, newest first unless direction is "asc". The page token is
+        the id of the last activity of the previous page."""
+        codes = None
+        if activity_types:
+            try:
+                codes = {ACTIVITY_CODES[t] for t in activity_types}
+            except KeyError as e:
+                raise ValueError(f"invalid activity type: {e.args[0]}")
+        lo = bisect_right(self.ts, after_us) if after_us is not None else 0
+        hi = bisect_left(self.ts, until_us) if until_us is not None else len(self.ts)
+        if page_token:
+            row = self.row_from_id(page_token)
+            if direction == "asc":
+                lo = max(lo, row + 1)
+            else:
+                hi = min(hi, row)
+        rows = range(lo, hi) if direction == "asc" else range(hi - 1, lo - 1, -1)
+
+        kind = self.kind
+        page: List[Dict[str, Any]] = []
+        for row in rows:
+            if codes is not None and kind[row] not in codes:
+                continue
+            page.append(self.to_dict(row))
+            if len(page) == page_size:
+                break
+        return page
@@ -0,0 +1,206 @@
+import csv
+import random
+import sys
+import uuid
+from array import array
+from typing import Dict, List, Any, Optional, Iterator
+
+# Namespace used to derive stable asset ids: the same symbol always maps to the same uuid,
+# across restarts and across different universe sizes.
+ASSET_ID_NAMESPACE = uuid.UUID("6f1c2a52-3d4e-4b8a-9a0e-6b7c8d9e0f11")
+
+EXCHANGES = ("NASDAQ", "NYSE", "ARCA", "AMEX", "BATS")
+STATUSES = ("active", "inactive")
+ASSET_CLASS = "us_equity"
+
+# Bit flags packed into a single byte per asset
+FLAG_TRADABLE = 1
+FLAG_MARGINABLE = 2
+FLAG_SHORTABLE = 4
+FLAG_EASY_TO_BORROW = 8
+FLAG_FRACTIONABLE = 16
+ALL_FLAGS = FLAG_TRADABLE | FLAG_MARGINABLE | FLAG_SHORTABLE | FLAG_EASY_TO_BORROW | FLAG_FRACTIONABLE
+
+# Well-known listings always present in the universe (symbol, name, exchange)
+CORE_ASSETS = [
+    ("AAPL", "Apple Inc. Common Stock", "NASDAQ"),
+    ("MSFT", "Microsoft Corporation Common Stock", "NASDAQ"),
+    ("TSLA", "Tesla, Inc. Common Stock", "NASDAQ"),
+    ("GOOG", "Alphabet Inc. Class C Capital Stock", "NASDAQ"),
+    ("GOOGL", "Alphabet Inc. Class A Common Stock", "NASDAQ"),
+    ("AMZN", "Amazon.com, Inc. Common Stock", "NASDAQ"),
+    ("META", "Meta Platforms, Inc. Class A Common Stock", "NASDAQ"),
+    ("NVDA", "NVIDIA Corporation Common Stock", "NASDAQ"),
+    ("JPM", "JPMorgan Chase & Co. Common Stock", "NYSE"),
+    ("XOM", "Exxon Mobil Corporation Common Stock", "NYSE"),
+    ("KO", "Coca-Cola Company (The) Common Stock", "NYSE"),
+    ("SPY", "SPDR S&P 500 ETF Trust", "ARCA"),
+    ("QQQ", "Invesco QQQ Trust, Series 1", "NASDAQ"),
+    ("IWM", "iShares Russell 2000 ETF", "ARCA"),
+]
+
+
+def stable_asset_id(symbol: str) -> str:
+    return str(uuid.uuid5(ASSET_ID_NAMESPACE, symbol.upper()))
+
+
+def _synthetic_symbol(index: int) -> str:
+    # Bijective base-26 starting at 3 letters: AAA, AAB, ... ZZZ, AAAA, ...
+    index += 26 * 26 + 26 + 1  # skip the 1- and 2-letter range
+    letters = []
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters.append(chr(ord("A") + rem))
+    return "".join(reversed(letters))
+
+
+class AssetTable:
+    """Column-oriented, indexed table of the static asset universe.
+
+    Every attribute is stored in a parallel column (interned strings or compact arrays)
+    and rows are addressed by integer index, so lookups on the order path are a single
+    dict probe and no per-asset dict is kept in memory.
+    """
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.exchange_codes = array("B")
+        self.status_codes = array("B")
+        self.flags = array("B")
+        self._row_by_symbol: Dict[str, int] = {}
+        self._row_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def add(self, symbol: str, name: str = "", exchange: str = "NASDAQ",
+            status: str = "active", flags: int = ALL_FLAGS) -> int:
+        symbol = sys.intern(symbol.strip().upper())
+        existing = self._row_by_symbol.get(symbol)
+        if existing is not None:
+            return existing
+        exchange = exchange.upper()
+        if exchange not in EXCHANGES:
+            raise ValueError(f"Unknown exchange {exchange!r} for {symbol}")
+        status = status.lower()
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status {status!r} for {symbol}")
+        row = len(self.symbols)
+        asset_id = stable_asset_id(symbol)
+        self.symbols.append(symbol)
+        self.ids.append(asset_id)
+        self.names.append(name or f"{symbol} Simulated Common Stock")
+        self.exchange_codes.append(EXCHANGES.index(exchange))
+        self.status_codes.append(STATUSES.index(status))
+        self.flags.append(flags)
+        self._row_by_symbol[symbol] = row
+        self._row_by_id[asset_id] = row
+        return row
+
+    def row_for_symbol(self, symbol: str) -> Optional[int]:
+        return self._row_by_symbol.get(symbol.upper())
+
+    def row_for(self, symbol_or_asset_id: str) -> Optional[int]:
+        row = self._row_by_symbol.get(symbol_or_asset_id.upper())
+        if row is None:
+            row = self._row_by_id.get(symbol_or_asset_id.lower())
+        return row
+
+    def exchange(self, row: int) -> str:
+        return EXCHANGES[self.exchange_codes[row]]
+
+    def is_active(self, row: int) -> bool:
+        return self.status_codes[row] == 0
+
+    def has_flag(self, row: int, flag: int) -> bool:
+        return bool(self.flags[row] & flag)
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        flags = self.flags[row]
+        return {
+            "id": self.ids[row],
+            "class": ASSET_CLASS,
+            "exchange": EXCHANGES[self.exchange_codes[row]],
+            "symbol": self.symbols[row],
+            "name": self.names[row],
+            "status": STATUSES[self.status_codes[row]],
+            "tradable": bool(flags & FLAG_TRADABLE),
+            "marginable": bool(flags & FLAG_MARGINABLE),
+            "shortable": bool(flags & FLAG_SHORTABLE),
+            "easy_to_borrow": bool(flags & FLAG_EASY_TO_BORROW),
+            "fractionable": bool(flags & FLAG_FRACTIONABLE),
+            "min_order_size": "1" if not flags & FLAG_FRACTIONABLE else "0.0001",
+            "min_trade_increment": "1" if not flags & FLAG_FRACTIONABLE else "0.0001",
+            "price_increment": "0.01",
+            "maintenance_margin_requirement": 30 if flags & FLAG_MARGINABLE else 100,
+            "attributes": [],
+        }
+
+    def iter_rows(self, status: Optional[str] = None, asset_class: Optional[str] = None,
+                  exchange: Optional[str] = None) -> Iterator[int]:
+        if asset_class and asset_class != ASSET_CLASS:
+            return
+        status_code = STATUSES.index(status.lower()) if status and status.lower() in STATUSES else None
+        if status and status_code is None:
+            return
+        exchange_code = EXCHANGES.index(exchange.upper()) if exchange and exchange.upper() in EXCHANGES else None
+        if exchange and exchange_code is None:
+            return
+        status_codes = self.status_codes
+        exchange_codes = self.exchange_codes
+        for row in range(len(self.symbols)):
+            if status_code is not None and status_codes[row] != status_code:
+                continue
+            if exchange_code is not None and exchange_codes[row] != exchange_code:
+                continue
+            yield row
+
+
+def load_asset_table(size: int, seed: int = 0, path: Optional[str] = None) -> AssetTable:
+    """Build the asset universe once: core listings, an optional CSV file, then synthetic
+    symbols until `size` assets exist."""
+    table = AssetTable()
+    for symbol, name, exchange in CORE_ASSETS:
+        table.add(symbol, name, exchange)
+
+    if path:
+        # CSV columns: symbol,name,exchange,status,tradable,marginable,shortable,easy_to_borrow,fractionable
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                flags = 0
+                for column, flag in (("tradable", FLAG_TRADABLE), ("marginable", FLAG_MARGINABLE),
+                                     ("shortable", FLAG_SHORTABLE), ("easy_to_borrow", FLAG_EASY_TO_BORROW),
+                                     ("fractionable", FLAG_FRACTIONABLE)):
+                    if str(record.get(column, "true")).strip().lower() in ("1", "true", "yes"):
+                        flags |= flag
+                try:
+                    if not (record.get("symbol") or "").strip():
+                        raise ValueError("missing symbol")
+                    table.add(record["symbol"], record.get("name") or "", record.get("exchange") or "NASDAQ",
+                              record.get("status") or "active", flags)
+                except ValueError as e:
+                    raise ValueError(f"{path}, line {reader.line_num}: {e}") from e
+
+    rng = random.Random(seed)
+    index = 0
+    while len(table) < size:
+        symbol = _synthetic_symbol(index)
+        index += 1
+        if table.row_for_symbol(symbol) is not None:
+            continue
+        # Mostly tradable, marginable, fractionable listings with a few harder-to-trade names
+        flags = FLAG_TRADABLE | FLAG_MARGINABLE
+        if rng.random() < 0.85:
+            flags |= FLAG_SHORTABLE
+            if rng.random() < 0.9:
+                flags |= FLAG_EASY_TO_BORROW
+        if rng.random() < 0.7:
+            flags |= FLAG_FRACTIONABLE
+        status = "inactive" if rng.random() < 0.02 else "active"
+        if status == "inactive":
+            flags &= ~FLAG_TRADABLE
+        table.add(symbol, "", EXCHANGES[rng.randrange(len(EXCHANGES))], status, flags)
+    return table
@@ -1,9 +1,35 @@
-from fastapi import FastAPI, HTTPException, status as http_status # Renamed status to avoid conflict
+from fastapi import FastAPI, HTTPException, Request, status as http_status # Renamed status to avoid conflict
+from fastapi.responses import JSONResponse, Response
 import uvicorn
-from config.settings import MOCK_API_BASE_URL
+from config.settings import (
+    MOCK_API_BASE_URL,
+    ASSET_UNIVERSE_SIZE,
+    ASSET_UNIVERSE_SEED,
+    ASSET_UNIVERSE_FILE,
+    STRICT_ASSET_VALIDATION,
+    PORTFOLIO_HISTORY_INTERVAL,
+    ORDER_CACHE_MAX_BYTES,
+    ACCOUNT_MULTIPLIER,
+    SHORTING_ENABLED,
+    TRAFFIC_RECORD_FILE,
+    PROFILE_DIR,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SAMPLE_INTERVAL,
+    SIMULATOR_INSTANCE,
+)
+from mock_service.assets import load_asset_table, FLAG_TRADABLE
+from mock_service.portfolio_history import PortfolioHistory, parse_period, default_timeframe
+from mock_service.activities import ActivityLedger
+from mock_service.orders import OrderBook, iso_to_micros
+from mock_service.risk import RiskBook, RiskRejection
 from pydantic import BaseModel
 from urllib.parse import urlparse
+import asyncio
+import json
+import time
 import uuid
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
 
@@ -30,10 +56,102 @@ mock_account_data: Dict[str, Any] = {
     "created_at": "2023-01-01T00:00:00.000000Z"
 }
 mock_positions_data: List[Dict[str, Any]] = []
-mock_orders_data: Dict[str, Dict[str, Any]] = {} # Store orders by order_id
-
-
-app = FastAPI()
+positions_by_symbol: Dict[str, Dict[str, Any]] = {}  # same dicts as mock_positions_data
+
+# Static asset universe, loaded once. Symbol and id lookups are O(1) dict probes.
+asset_table = load_asset_table(ASSET_UNIVERSE_SIZE, seed=ASSET_UNIVERSE_SEED, path=ASSET_UNIVERSE_FILE)
+# Orders in submission order, stored column-wise and serialized on demand
+order_book = OrderBook(asset_table.ids, asset_table.symbols, body_cache_max_bytes=ORDER_CACHE_MAX_BYTES)
+# Serialized /v2/assets bodies by filter. The table only ever grows, so its length is the cache version.
+assets_response_cache: Dict[tuple, bytes] = {}
+
+# Equity history at fixed resolutions in preallocated ring buffers
+portfolio_history = PortfolioHistory()
+last_recorded_day: Optional[int] = None
+
+# Append-only record of every fill and cash movement, opened with the initial deposit
+activity_ledger = ActivityLedger(mock_account_data["id"])
+activity_ledger.record_cash(
+    "CSD", float(mock_account_data["cash"]),
+    now_us=int(datetime.fromisoformat(mock_account_data["created_at"].replace('Z', '+00:00')).timestamp()) * 1_000_000)
+
+# Running cash, position, margin and buying-power totals, plus reservations of open orders
+risk_book = RiskBook(asset_table, float(mock_account_data["cash"]), multiplier=ACCOUNT_MULTIPLIER,
+                     shorting_enabled=SHORTING_ENABLED)
+risk_book.update_account(mock_account_data)
+
+# Simulated fill prices: a fixed price per symbol
+MOCK_FILL_PRICES = {"AAPL": 150.0, "MSFT": 300.0, "TSLA": 250.0, "GOOG": 140.0}
+
+
+def mock_fill_price(symbol: str) -> float:
+    return MOCK_FILL_PRICES.get(symbol, 50.0)
+
+
+def record_equity(now: Optional[float] = None):
+    """Record the current equity into the portfolio history. On the first recording of a new
+    day, the previous recording's equity becomes last_equity, the base value for profit/loss."""
+    global last_recorded_day
+    now = int(now if now is not None else time.time())
+    day = now // 86400
+    equity = risk_book.equity()
+    if last_recorded_day is not None and day != last_recorded_day:
+        mock_account_data["last_equity"] = str(portfolio_history.last_equity())
+    last_recorded_day = day
+    portfolio_history.record(now, equity, float(mock_account_data["last_equity"]))
+
+async def run_equity_recorder():
+    while True:
+        await asyncio.sleep(PORTFOLIO_HISTORY_INTERVAL)
+        record_equity()
+
+# Set once startup is done; the asset universe is already loaded at import
+ready = False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ready
+    record_equity()
+    recorder_task = asyncio.create_task(run_equity_recorder())
+    ready = True
+    yield
+    ready = False
+    recorder_task.cancel()
+    await asyncio.gather(recorder_task, return_exceptions=True)
+
+
+app = FastAPI(lifespan=lifespan)
+if TRAFFIC_RECORD_FILE:
+    from traffic.record import TrafficRecorder
+    app.add_middleware(TrafficRecorder, path=TRAFFIC_RECORD_FILE, service="trading")
+if PROFILE_DIR:
+    from profiling.middleware import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware, directory=PROFILE_DIR, service="trading", mode=PROFILE_MODE,
+                       sample_rate=PROFILE_SAMPLE_RATE, sample_interval=PROFILE_SAMPLE_INTERVAL)
+
+class AlpacaAPIError(Exception):
+    # Rendered in Alpaca's error shape: {"code": ..., "message": ...}
+    def __init__(self, status_code: int, code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+@app.exception_handler(AlpacaAPIError)
+async def alpaca_api_error_handler(request: Request, exc: AlpacaAPIError):
+    return JSONResponse(status_code=exc.status_code, content={"code": exc.code, "message": exc.message})
+
+def resolve_order_asset(symbol: str) -> int:
+    """Return the asset table row for an order's symbol, rejecting unknown or untradable assets."""
+    row = asset_table.row_for_symbol(symbol)
+    if row is None:
+        if STRICT_ASSET_VALIDATION:
+            raise AlpacaAPIError(422, 40010001, f"asset \"{symbol}\" not found")
+        # Lenient mode: list the symbol on first use so it still gets a stable id
+        row = asset_table.add(symbol)
+    if not asset_table.is_active(row) or not asset_table.has_flag(row, FLAG_TRADABLE):
+        raise AlpacaAPIError(422, 40010001, f"asset {symbol} is not tradable")
+    return row
 
 # Pydantic model for order request body
 class OrderRequest(BaseModel):
@@ -46,16 +164,91 @@ class OrderRequest(BaseModel):
     stop_price: Optional[float] = None  # Changed to float
     client_order_id: Optional[str] = None # Optional
 
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    if not ready:
+        return JSONResponse(status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+    return {"status": "ready", "instance": SIMULATOR_INSTANCE} if SIMULATOR_INSTANCE else {"status": "ready"}
+
 @app.get("/v2/account")
 async def get_account_info():
-    # Update portfolio value based on current positions
-    current_portfolio_value = float(mock_account_data["cash"])
-    for pos in mock_positions_data:
-        current_portfolio_value += float(pos.get("market_value", "0.00"))
+    risk_book.update_account(mock_account_data)
+    current_portfolio_value = risk_book.equity()
     mock_account_data["portfolio_value"] = str(current_portfolio_value)
     mock_account_data["equity"] = str(current_portfolio_value) # Simplified equity calculation
     return mock_account_data
 
+@app.get("/v2/account/portfolio/history")
+async def get_portfolio_history(period: Optional[str] = None, timeframe: Optional[str] = None,
+                                start: Optional[str] = None, end: Optional[str] = None,
+                                date_end: Optional[str] = None):
+    try:
+        period_seconds = parse_period(period or "1M")
+        if end:
+            end_ts = int(datetime.fromisoformat(end.replace('Z', '+00:00')).timestamp())
+        elif date_end:
+            end_ts = int(datetime.fromisoformat(date_end).replace(tzinfo=timezone.utc).timestamp()) + 86400 - 1
+        else:
+            end_ts = int(time.time())
+        if start:
+            start_ts = int(datetime.fromisoformat(start.replace('Z', '+00:00')).timestamp())
+            if not period:
+                period_seconds = end_ts - start_ts
+        else:
+            start_ts = end_ts - period_seconds
+        return portfolio_history.query(timeframe or default_timeframe(period_seconds), start_ts, end_ts)
+    except ValueError as e:
+        raise AlpacaAPIError(422, 40010001, str(e))
+
+def parse_activity_time(value: str) -> int:
+    # Accepts a date or an RFC3339 timestamp; returns epoch microseconds
+    if 'T' not in value:
+        value += "T00:00:00+00:00"
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1_000_000)
+
+def query_activities(activity_types: Optional[List[str]], date: Optional[str], until: Optional[str],
+                     after: Optional[str], direction: Optional[str], page_size: Optional[int],
+                     page_token: Optional[str]) -> Response:
+    try:
+        direction = direction or "desc"
+        if direction not in ("asc", "desc"):
+            raise ValueError(f"invalid direction: {direction}")
+        page_size = page_size or 100
+        if not 1 <= page_size <= 100:
+            raise ValueError("page_size must be between 1 and 100")
+        if date:
+            after_us = parse_activity_time(date) - 1
+            until_us = after_us + 1 + 86400 * 1_000_000
+        else:
+            after_us = parse_activity_time(after) if after else None
+            until_us = parse_activity_time(until) if until else None
+        page = activity_ledger.query(activity_types, after_us, until_us, direction, page_size, page_token)
+    except ValueError as e:
+        raise AlpacaAPIError(422, 40010001, str(e))
+    return Response(content=json.dumps(page), media_type="application/json")
+
+@app.get("/v2/account/activities")
+async def list_activities(activity_types: Optional[str] = None, date: Optional[str] = None,
+                          until: Optional[str] = None, after: Optional[str] = None,
+                          direction: Optional[str] = None, page_size: Optional[int] = None,
+                          page_token: Optional[str] = None):
+    types = [t.strip().upper() for t in activity_types.split(',') if t.strip()] if activity_types else None
+    return query_activities(types, date, until, after, direction, page_size, page_token)
+
+@app.get("/v2/account/activities/{activity_type}")
+async def list_activities_by_type(activity_type: str, date: Optional[str] = None,
+                                  until: Optional[str] = None, after: Optional[str] = None,
+                                  direction: Optional[str] = None, page_size: Optional[int] = None,
+                                  page_token: Optional[str] = None):
+    return query_activities([activity_type.upper()], date, until, after, direction, page_size, page_token)
+
 @app.get("/v2/positions")
 async def list_positions():
     # In a real scenario, you might want to update current_price and market_value here
@@ -64,196 +257,176 @@ async def list_positions():
     live_positions = [p for p in mock_positions_data if float(p.get("qty", "0")) != 0]
     return live_positions
 
+@app.get("/v2/assets")
+async def list_assets(status: Optional[str] = None, asset_class: Optional[str] = None,
+                      exchange: Optional[str] = None):
+    cache_key = (len(asset_table), status, asset_class, exchange)
+    body = assets_response_cache.get(cache_key)
+    if body is None:
+        assets = [asset_table.to_dict(row) for row in asset_table.iter_rows(status, asset_class, exchange)]
+        body = json.dumps(assets).encode()
+        if len(assets_response_cache) > 64:
+            assets_response_cache.clear()
+        assets_response_cache[cache_key] = body
+    return Response(content=body, media_type="application/json")
+
+@app.get("/v2/assets/{symbol_or_asset_id}")
+async def get_asset(symbol_or_asset_id: str):
+    row = asset_table.row_for(symbol_or_asset_id)
+    if row is None:
+        raise AlpacaAPIError(http_status.HTTP_404_NOT_FOUND, 40410000, "asset not found")
+    return asset_table.to_dict(row)
+
+def update_position(asset_row: int, symbol: str, side: str, qty: float, fill_price: float, new_qty: float):
+    pos = positions_by_symbol.get(symbol)
+    if pos is None:
+        pos = {
+            "asset_id": asset_table.ids[asset_row],
+            "symbol": symbol,
+            "exchange": asset_table.exchange(asset_row),
+            "asset_class": "us_equity",
+            "avg_entry_price": str(fill_price),
+            "qty": "0",
+            "side": "long",
+            "market_value": "0.0",
+            "cost_basis": "0.0",
+            "unrealized_pl": "0.00",
+            "unrealized_plpc": "0.0000",
+            "unrealized_intraday_pl": "0.00",
+            "unrealized_intraday_plpc": "0.0000",
+            "current_price": str(fill_price),
+            "lastday_price": str(fill_price - 1.0),
+            "change_today": "0.0000"
+        }
+        mock_positions_data.append(pos)
+        positions_by_symbol[symbol] = pos
+
+    current_qty = float(pos["qty"])
+    current_avg_entry = float(pos["avg_entry_price"])
+    current_cost_basis = float(pos["cost_basis"])
+    if current_qty == 0 or (current_qty > 0) == (side == "buy"):
+        # Opening or adding to a position: average the entry price
+        new_cost_basis = current_cost_basis + (qty if side == "buy" else -qty) * fill_price
+        pos["avg_entry_price"] = str(new_cost_basis / new_qty if new_qty != 0 else 0)
+    else:
+        # Reducing a position: cost basis shrinks at the average entry price
+        # A more accurate method would use tax lot accounting (FIFO, LIFO, etc.)
+        new_cost_basis = new_qty * current_avg_entry
+        if new_qty == 0:
+            pos["avg_entry_price"] = "0" # Reset if position is closed; list_positions filters it out
+    pos["qty"] = str(new_qty)
+    pos["cost_basis"] = str(new_cost_basis)
+    pos["side"] = "short" if new_qty < 0 else "long"
+    pos["market_value"] = str(new_qty * fill_price)
+    pos["current_price"] = str(fill_price)
+    # Simplified P/L: (current_price - avg_entry_price) * qty
+    if new_qty != 0:
+        pos["unrealized_pl"] = str((fill_price - float(pos["avg_entry_price"])) * new_qty)
+    else:
+        pos["unrealized_pl"] = "0.00"
+
 @app.post("/v2/orders", status_code=http_status.HTTP_200_OK)
 async def place_order_endpoint(order_request: OrderRequest):
-    order_id = str(uuid.uuid4())
-    client_order_id = order_request.client_order_id or f"mock_client_{str(uuid.uuid4())[:12]}"
-    now_utc = datetime.now(timezone.utc)
-    now_iso = now_utc.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-
-    order_data = {
-        "id": order_id,
-        "client_order_id": client_order_id,
-        "created_at": now_iso,
-        "updated_at": now_iso,
-        "submitted_at": now_iso,
-        "filled_at": None,
-        "expired_at": None,
-        "canceled_at": None,
-        "failed_at": None,
-        "replaced_at": None,
-        "replaced_by": None,
-        "replaces": None,
-        "asset_id": str(uuid.uuid4()), # Mock asset_id
-        "symbol": order_request.symbol.upper(),
-        "asset_class": "us_equity", # Assuming equity
-        "notional": None,
-        "qty": str(order_request.qty),
-        "filled_qty": "0",
-        "filled_avg_price": None,
-        "order_class": "",
-        "order_type": order_request.type,
-        "type": order_request.type,
-        "side": order_request.side,
-        "time_in_force": order_request.time_in_force,
-        "limit_price": str(order_request.limit_price) if order_request.limit_price is not None else None,
-        "stop_price": str(order_request.stop_price) if order_request.stop_price is not None else None,
-        "status": "accepted", # Initial status for non-market orders
-        "extended_hours": False,
-        "legs": None,
-        "trail_percent": None,
-        "trail_price": None,
-        "hwm": None # High Water Mark for trail orders
-    }
+    symbol = order_request.symbol.upper()
+    asset_row = resolve_order_asset(symbol)
+    if order_request.qty <= 0:
+        raise AlpacaAPIError(422, 40010001, "qty must be > 0")
+    if order_request.type in ("limit", "stop_limit") and order_request.limit_price is None:
+        raise AlpacaAPIError(422, 40010001, "limit_price is required")
+    if order_request.type in ("stop", "stop_limit") and order_request.stop_price is None:
+        raise AlpacaAPIError(422, 40010001, "stop_price is required")
+
+    # Pre-trade checks at the order's limit (or stop) price, market orders at their fill price
+    check_price = order_request.limit_price or order_request.stop_price or mock_fill_price(symbol)
+    try:
+        reservation, held_qty = risk_book.check(asset_row, order_request.side, order_request.qty, check_price)
+    except RiskRejection as e:
+        raise AlpacaAPIError(http_status.HTTP_403_FORBIDDEN, 40310000, str(e))
+
+    now_us = time.time_ns() // 1000
+    try:
+        row = order_book.add(asset_row, order_request.qty, order_request.type, order_request.side,
+                             order_request.time_in_force, now_us,
+                             limit_price=order_request.limit_price, stop_price=order_request.stop_price,
+                             client_order_id=order_request.client_order_id)
+    except KeyError as e:
+        raise AlpacaAPIError(422, 40010001, f"invalid order field value: {e.args[0]}")
+    risk_book.reserve(row, asset_row, order_request.side, reservation, held_qty)
 
     if order_request.type == "market":
-        order_data["status"] = "filled"
-        order_data["filled_at"] = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-        order_data["filled_qty"] = str(order_request.qty)
-
-        # Simulate a fill price (e.g., a fixed price or slightly randomized from a mock market)
-        # For now, use a very simple fixed price based on symbol
-        mock_fill_price = 0.0
-        if order_request.symbol.upper() == "AAPL": mock_fill_price = 150.0
-        elif order_request.symbol.upper() == "MSFT": mock_fill_price = 300.0
-        elif order_request.symbol.upper() == "TSLA": mock_fill_price = 250.0
-        elif order_request.symbol.upper() == "GOOG": mock_fill_price = 140.0 # For tests
-        else: mock_fill_price = 50.0 # Default for other symbols
-
-        order_data["filled_avg_price"] = str(mock_fill_price)
-
-        # Update positions
-        found_position = False
-        for pos_idx, pos in enumerate(mock_positions_data):
-            if pos["symbol"] == order_request.symbol.upper():
-                current_qty = float(pos["qty"])
-                current_avg_entry = float(pos["avg_entry_price"])
-                current_cost_basis = float(pos.get("cost_basis", str(current_qty * current_avg_entry)))
-
-                order_value = order_request.qty * mock_fill_price
-
-                if order_request.side == "buy":
-                    new_qty = current_qty + order_request.qty
-                    new_cost_basis = current_cost_basis + order_value
-                    pos["avg_entry_price"] = str(new_cost_basis / new_qty if new_qty != 0 else 0)
-                    pos["qty"] = str(new_qty)
-                    pos["cost_basis"] = str(new_cost_basis)
-                    pos["side"] = "long" # Can only be long in this simplified model
-                else: # sell
-                    new_qty = current_qty - order_request.qty
-                    # Cost basis reduces proportionally on sell. Simplified: reduce by avg_entry_price * sell_qty
-                    # A more accurate method would use tax lot accounting (FIFO, LIFO, etc.)
-                    sold_cost_basis_reduction = order_request.qty * current_avg_entry
-                    pos["cost_basis"] = str(current_cost_basis - sold_cost_basis_reduction)
-                    pos["qty"] = str(new_qty)
-                    if new_qty == 0:
-                         pos["avg_entry_price"] = "0" # Reset if position is closed
-                         # Optionally remove the position from mock_positions_data if qty is 0
-                         # mock_positions_data.pop(pos_idx)
-                         # For now, keep it but qty will be 0, list_positions will filter it.
-
-                pos["market_value"] = str(float(pos["qty"]) * mock_fill_price)
-                pos["current_price"] = str(mock_fill_price)
-                # Simplified P/L: (current_price - avg_entry_price) * qty
-                if float(pos["qty"]) != 0:
-                    pos["unrealized_pl"] = str((mock_fill_price - float(pos["avg_entry_price"])) * float(pos["qty"]))
-                else:
-                    pos["unrealized_pl"] = "0.00"
-
-                found_position = True
-                break
-
-        if not found_position and order_request.side == "buy":
-            new_position_cost = order_request.qty * mock_fill_price
-            mock_positions_data.append({
-                "asset_id": str(uuid.uuid4()),
-                "symbol": order_request.symbol.upper(),
-                "exchange": "NASDAQ",
-                "asset_class": "us_equity",
-                "avg_entry_price": str(mock_fill_price),
-                "qty": str(order_request.qty),
-                "side": "long",
-                "market_value": str(new_position_cost),
-                "cost_basis": str(new_position_cost),
-                "unrealized_pl": "0.00",
-                "unrealized_plpc": "0.0000",
-                "unrealized_intraday_pl": "0.00",
-                "unrealized_intraday_plpc": "0.0000",
-                "current_price": str(mock_fill_price),
-                "lastday_price": str(mock_fill_price - 1.0),
-                "change_today": "0.0000"
-            })
-
-        # Update cash
-        current_cash = float(mock_account_data["cash"])
-        order_total_value = order_request.qty * mock_fill_price
-        if order_request.side == "buy":
-            mock_account_data["cash"] = str(current_cash - order_total_value)
-        else: # sell
-            mock_account_data["cash"] = str(current_cash + order_total_value)
-
-        # Update buying power (simplified, assumes cash account)
-        mock_account_data["buying_power"] = mock_account_data["cash"]
-        mock_account_data["regt_buying_power"] = mock_account_data["cash"]
-        mock_account_data["non_marginable_buying_power"] = mock_account_data["cash"]
-
-        # Update portfolio value and equity
-        current_portfolio_value = float(mock_account_data["cash"])
-        current_long_market_value = 0.0
-        for pos in mock_positions_data:
-            if float(pos.get("qty", "0")) > 0 : # only consider active positions
-                 pos_market_val = float(pos.get("qty")) * float(pos.get("current_price", str(mock_fill_price)))
-                 current_portfolio_value += pos_market_val
-                 current_long_market_value += pos_market_val
-
+        fill_price = mock_fill_price(symbol)
+        order_book.fill(row, order_request.qty, fill_price, now_us)
+        risk_book.release(row)
+        new_qty = risk_book.apply_fill(asset_row, order_request.side, order_request.qty, fill_price)
+        update_position(asset_row, symbol, order_request.side, order_request.qty, fill_price, new_qty)
+
+        risk_book.update_account(mock_account_data)
+        current_portfolio_value = risk_book.equity()
         mock_account_data["portfolio_value"] = str(current_portfolio_value)
         mock_account_data["equity"] = str(current_portfolio_value) # Simplified equity
-        mock_account_data["long_market_value"] = str(current_long_market_value)
+        activity_ledger.record_fill(order_book.order_id(row), symbol, order_request.side, order_request.qty,
+                                    fill_price, cum_qty=order_request.qty, leaves_qty=0.0)
+        record_equity()
 
     elif order_request.type == "limit": # For limit orders, just accept them for now.
-        order_data["status"] = "new" # Or "pending_new" or "accepted" as per Alpaca docs for unfillable limits
+        order_book.set_status(row, "new", now_us) # Or "pending_new" or "accepted" as per Alpaca docs for unfillable limits
 
-    mock_orders_data[order_id] = order_data
-    return order_data
+    return Response(content=order_book.to_json(row), media_type="application/json")
 
 @app.get("/v2/orders")
 async def list_orders_endpoint(status: Optional[str] = None, limit: Optional[int] = None,
                                after: Optional[str] = None, until: Optional[str] = None,
                                direction: Optional[str] = "desc", nested: Optional[bool] = False,
                                symbols: Optional[str] = None):
-    orders_to_return = list(mock_orders_data.values())
-
-    if status and status != "all":
-        statuses = status.split(',')
-        orders_to_return = [o for o in orders_to_return if o["status"] in statuses]
-
-    if symbols:
-        symbol_list = [s.strip().upper() for s in symbols.split(',')]
-        orders_to_return = [o for o in orders_to_return if o["symbol"] in symbol_list]
-
-    # Filtering by date (simplified, assumes ISO format)
-    if after:
-        orders_to_return = [o for o in orders_to_return if o["submitted_at"] > after]
-    if until:
-        orders_to_return = [o for o in orders_to_return if o["submitted_at"] < until]
-
-    # Sorting
-    orders_to_return.sort(key=lambda x: x["submitted_at"], reverse=(direction == "desc"))
-
-    if limit:
-        orders_to_return = orders_to_return[:limit]
-
-    return orders_to_return
+    try:
+        rows = order_book.select(
+            statuses=status.split(',') if status and status != "all" else None,
+            symbols=[s.strip().upper() for s in symbols.split(',')] if symbols else None,
+            after_us=iso_to_micros(after) if after else None,
+            until_us=iso_to_micros(until) if until else None,
+            direction=direction or "desc",
+            limit=limit,
+        )
+    except ValueError as e:
+        raise AlpacaAPIError(422, 40010001, str(e))
+    return Response(content=order_book.rows_to_json(rows), media_type="application/json")
+
+@app.get("/v2/orders:by_client_order_id")
+async def get_order_by_client_order_id(client_order_id: str):
+    row = order_book.find(client_order_id)
+    if row is None:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Order not found")
+    return Response(content=order_book.to_json(row), media_type="application/json")
 
 @app.get("/v2/orders/{order_id}")
 async def get_order_by_id(order_id: str):
-    if order_id in mock_orders_data:
-        return mock_orders_data[order_id]
-    # Check if it's a client_order_id
-    for order in mock_orders_data.values():
-        if order["client_order_id"] == order_id:
-            return order
-    raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Order not found")
+    # Looks up by order id, then by client_order_id
+    row = order_book.find(order_id)
+    if row is None:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Order not found")
+    return Response(content=order_book.to_json(row), media_type="application/json")
+
+def cancel_order_row(row: int) -> None:
+    if order_book.is_terminal(row):
+        raise AlpacaAPIError(422, 42210000, f"order is already in \"{order_book.status(row)}\" state")
+    order_book.cancel(row, time.time_ns() // 1000)
+    risk_book.release(row)
+
+@app.delete("/v2/orders/{order_id}", status_code=http_status.HTTP_204_NO_CONTENT)
+async def cancel_order_endpoint(order_id: str):
+    row = order_book.find(order_id)
+    if row is None:
+        raise AlpacaAPIError(http_status.HTTP_404_NOT_FOUND, 40410000, "order not found")
+    cancel_order_row(row)
+    return Response(status_code=http_status.HTTP_204_NO_CONTENT)
+
+@app.delete("/v2/orders")
+async def cancel_all_orders_endpoint():
+    results = []
+    for row in order_book.select(statuses=["open"], direction="asc"):
+        cancel_order_row(row)
+        results.append({"id": order_book.order_id(row), "status": 200, "body": order_book.to_dict(row)})
+    return JSONResponse(status_code=207, content=results)
 
 if __name__ == "__main__":
     parsed_url = urlparse(MOCK_API_BASE_URL)
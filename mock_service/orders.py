@@ -0,0 +1,265 @@
+import json
+import math
+import uuid
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterable
+
+ORDER_TYPES = ("market", "limit", "stop", "stop_limit", "trailing_stop")
+SIDES = ("buy", "sell")
+TIME_IN_FORCES = ("day", "gtc", "opg", "cls", "ioc", "fok")
+ORDER_STATUSES = ("new", "accepted", "pending_new", "partially_filled", "filled", "canceled", "expired",
+                  "rejected", "replaced", "pending_cancel", "pending_replace", "done_for_day", "stopped",
+                  "suspended", "calculated", "held", "accepted_for_bidding")
+TERMINAL_STATUSES = frozenset(ORDER_STATUSES.index(s) for s in ("filled", "canceled", "expired", "rejected", "replaced"))
+
+TYPE_CODES = {name: code for code, name in enumerate(ORDER_TYPES)}
+SIDE_CODES = {name: code for code, name in enumerate(SIDES)}
+TIF_CODES = {name: code for code, name in enumerate(TIME_IN_FORCES)}
+STATUS_CODES = {name: code for code, name in enumerate(ORDER_STATUSES)}
+
+NAN = float("nan")  # missing price
+AUTO_CLIENT_ID_PREFIX = "mock_client_"
+
+
+def micros_to_iso(ts_us: int) -> Optional[str]:
+    # 0 stands for "not set" in the timestamp columns
+    if not ts_us:
+        return None
+    ts = datetime.fromtimestamp(ts_us / 1_000_000, tz=timezone.utc)
+    return ts.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def iso_to_micros(value: str) -> int:
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1_000_000)
+
+
+def _price(value: float) -> Optional[str]:
+    return None if math.isnan(value) else str(value)
+
+
+class OrderBook:
+    """All orders of the session, stored column-wise in submission order.
+
+    An order is a row: ids, quantities, prices, timestamps and enum codes live in typed arrays
+    (about 100 bytes per order plus the id index, instead of a ~35-key dict of strings). The
+    Alpaca JSON shape is only built when an order is returned. Terminal orders never change
+    again, so their serialized bytes are kept in a size-bounded LRU and reused by later reads.
+    """
+
+    def __init__(self, asset_ids: List[str], asset_symbols: List[str], body_cache_max_bytes: int = 64 * 1024 * 1024):
+        # Asset table columns, indexed by asset row; orders only store the row
+        self.asset_ids = asset_ids
+        self.asset_symbols = asset_symbols
+        self.uids = bytearray()         # 16-byte order ids
+        self.client_ids: List[Optional[str]] = []  # None when generated from the order id
+        self.asset_rows = array("I")
+        self.qty = array("d")
+        self.filled_qty = array("d")
+        self.filled_avg_price = array("d")
+        self.limit_price = array("d")
+        self.stop_price = array("d")
+        self.created_us = array("q")
+        self.updated_us = array("q")
+        self.filled_us = array("q")
+        self.canceled_us = array("q")
+        self.type_code = array("B")
+        self.side_code = array("B")
+        self.tif_code = array("B")
+        self.status_code = array("B")
+        self._row_by_key: Dict[int, int] = {}  # first 8 bytes of the order id -> row
+        self._row_by_client_id: Dict[str, int] = {}
+        self.body_cache_max_bytes = body_cache_max_bytes
+        self._bodies: "OrderedDict[int, bytes]" = OrderedDict()
+        self._bodies_size = 0
+
+    def __len__(self) -> int:
+        return len(self.status_code)
+
+    def add(self, asset_row: int, qty: float, order_type: str, side: str, time_in_force: str,
+            created_us: int, limit_price: Optional[float] = None, stop_price: Optional[float] = None,
+            client_order_id: Optional[str] = None) -> int:
+        """Append a new accepted order and return its row."""
+        type_code, side_code, tif_code = TYPE_CODES[order_type], SIDE_CODES[side], TIF_CODES[time_in_force]
+        while True:
+            # Orders are indexed by the first 8 bytes of their id; redraw on the rare collision
+            order_uuid = uuid.uuid4()
+            key = int.from_bytes(order_uuid.bytes[:8], "big")
+            if key not in self._row_by_key:
+                break
+        row = len(self.status_code)
+        self.uids += order_uuid.bytes
+        self.client_ids.append(client_order_id)
+        self.asset_rows.append(asset_row)
+        self.qty.append(qty)
+        self.filled_qty.append(0.0)
+        self.filled_avg_price.append(NAN)
+        self.limit_price.append(limit_price if limit_price is not None else NAN)
+        self.stop_price.append(stop_price if stop_price is not None else NAN)
+        self.created_us.append(created_us)
+        self.updated_us.append(created_us)
+        self.filled_us.append(0)
+        self.canceled_us.append(0)
+        self.type_code.append(type_code)
+        self.side_code.append(side_code)
+        self.tif_code.append(tif_code)
+        self.status_code.append(STATUS_CODES["accepted"])
+        self._row_by_key[key] = row
+        if client_order_id is not None:
+            self._row_by_client_id[client_order_id] = row
+        return row
+
+    def order_id(self, row: int) -> str:
+        return str(uuid.UUID(bytes=bytes(self.uids[16 * row:16 * row + 16])))
+
+    def client_order_id(self, row: int) -> str:
+        client_id = self.client_ids[row]
+        if client_id is None:
+            client_id = AUTO_CLIENT_ID_PREFIX + self.uids[16 * row:16 * row + 8].hex()
+        return client_id
+
+    def status(self, row: int) -> str:
+        return ORDER_STATUSES[self.status_code[row]]
+
+    def is_terminal(self, row: int) -> bool:
+        return self.status_code[row] in TERMINAL_STATUSES
+
+    def find(self, id_or_client_order_id: str) -> Optional[int]:
+        """Row of an order by id or client_order_id, or None."""
+        try:
+            order_bytes = uuid.UUID(id_or_client_order_id).bytes
+            row = self._row_by_key.get(int.from_bytes(order_bytes[:8], "big"))
+            if row is not None and self.uids[16 * row:16 * row + 16] == order_bytes:
+                return row
+        except ValueError:
+            pass
+        row = self._row_by_client_id.get(id_or_client_order_id)
+        if row is None and id_or_client_order_id.startswith(AUTO_CLIENT_ID_PREFIX):
+            # Generated client ids carry the id key, so they need no index of their own
+            try:
+                row = self._row_by_key.get(int(id_or_client_order_id[len(AUTO_CLIENT_ID_PREFIX):], 16))
+            except ValueError:
+                return None
+            if row is not None and self.client_ids[row] is not None:
+                return None
+        return row
+
+    def set_status(self, row: int, status: str, now_us: int) -> None:
+        self.status_code[row] = STATUS_CODES[status]
+        self.updated_us[row] = now_us
+
+    def fill(self, row: int, qty: float, price: float, now_us: int) -> None:
+        """Apply an execution, averaging the fill price over everything filled so far."""
+        prev_qty = self.filled_qty[row]
+        prev_notional = prev_qty * self.filled_avg_price[row] if prev_qty else 0.0
+        filled = prev_qty + qty
+        self.filled_avg_price[row] = (prev_notional + qty * price) / filled
+        self.filled_qty[row] = filled
+        self.filled_us[row] = now_us
+        self.set_status(row, "filled" if filled >= self.qty[row] else "partially_filled", now_us)
+
+    def cancel(self, row: int, now_us: int) -> None:
+        self.canceled_us[row] = now_us
+        self.set_status(row, "canceled", now_us)
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        order_type = ORDER_TYPES[self.type_code[row]]
+        created_us, updated_us, filled_us = self.created_us[row], self.updated_us[row], self.filled_us[row]
+        # Market orders are created, filled and updated in the same instant: format once
+        created_at = micros_to_iso(created_us)
+        updated_at = created_at if updated_us == created_us else micros_to_iso(updated_us)
+        filled_at = updated_at if filled_us == updated_us else micros_to_iso(filled_us)
+        filled_qty = self.filled_qty[row]
+        return {
+            "id": self.order_id(row),
+            "client_order_id": self.client_order_id(row),
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "submitted_at": created_at,
+            "filled_at": filled_at,
+            "expired_at": None,
+            "canceled_at": micros_to_iso(self.canceled_us[row]),
+            "failed_at": None,
+            "replaced_at": None,
+            "replaced_by": None,
+            "replaces": None,
+            "asset_id": self.asset_ids[self.asset_rows[row]],
+            "symbol": self.asset_symbols[self.asset_rows[row]],
+            "asset_class": "us_equity",
+            "notional": None,
+            "qty": str(self.qty[row]),
+            "filled_qty": str(filled_qty) if filled_qty else "0",
+            "filled_avg_price": _price(self.filled_avg_price[row]),
+            "order_class": "",
+            "order_type": order_type,
+            "type": order_type,
+            "side": SIDES[self.side_code[row]],
+            "time_in_force": TIME_IN_FORCES[self.tif_code[row]],
+            "limit_price": _price(self.limit_price[row]),
+            "stop_price": _price(self.stop_price[row]),
+            "status": ORDER_STATUSES[self.status_code[row]],
+            "extended_hours": False,
+            "legs": None,
+            "trail_percent": None,
+            "trail_price": None,
+            "hwm": None,
+        }
+
+    def to_json(self, row: int) -> bytes:
+        bodies = self._bodies
+        body = bodies.get(row)
+        if body is not None:
+            bodies.move_to_end(row)
+            return body
+        body = json.dumps(self.to_dict(row)).encode()
+        if self.status_code[row] in TERMINAL_STATUSES:
+            bodies[row] = body
+            self._bodies_size += len(body)
+            while self._bodies_size > self.body_cache_max_bytes:
+                _, evicted = bodies.popitem(last=False)
+                self._bodies_size -= len(evicted)
+        return body
+
+    def rows_to_json(self, rows: Iterable[int]) -> bytes:
+        to_json = self.to_json
+        return b"[" + b",".join(to_json(row) for row in rows) + b"]"
+
+    def select(self, statuses: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+               after_us: Optional[int] = None, until_us: Optional[int] = None, direction: str = "desc",
+               limit: Optional[int] = None) -> List[int]:
+        """Rows matching the filters in submission order (newest first for "desc").
+        statuses may include "open" (not terminal) and "closed" (terminal)."""
+        codes = None
+        if statuses is not None:
+            codes = set()
+            for status in statuses:
+                if status == "open":
+                    codes.update(code for code in range(len(ORDER_STATUSES)) if code not in TERMINAL_STATUSES)
+                elif status == "closed":
+                    codes.update(TERMINAL_STATUSES)
+                elif status in STATUS_CODES:
+                    codes.add(STATUS_CODES[status])
+        symbol_set = set(symbols) if symbols is not None else None
+        status_code, asset_rows, created_us = self.status_code, self.asset_rows, self.created_us
+        asset_symbols = self.asset_symbols
+
+        count = len(status_code)
+        rows = range(count - 1, -1, -1) if direction == "desc" else range(count)
+        selected: List[int] = []
+        for row in rows:
+            if codes is not None and status_code[row] not in codes:
+                continue
+            if symbol_set is not None and asset_symbols[asset_rows[row]] not in symbol_set:
+                continue
+            if after_us is not None and created_us[row] <= after_us:
+                continue
+            if until_us is not None and created_us[row] >= until_us:
+                continue
+            selected.append(row)
+            if limit and len(selected) == limit:
+                break
+        return selected
@@ -0,0 +1,145 @@
+import re
+from array import array
+from typing import Dict, List, Any, Optional, Tuple
+
+# Resolution tiers: (timeframe, seconds per point, points kept). Each tier is a fixed-size
+# ring buffer, so memory is bounded no matter how long the simulation runs.
+TIERS = [
+    ("1Min", 60, 7 * 1440),         # 1 week
+    ("5Min", 300, 30 * 288),        # 30 days
+    ("15Min", 900, 90 * 96),        # 90 days
+    ("1H", 3600, 365 * 24),         # 1 year
+    ("1D", 86400, 10 * 365),        # 10 years
+]
+
+_PERIOD_RE = re.compile(r"^(\d+)([DWMA])$")
+_PERIOD_SECONDS = {"D": 86400, "W": 7 * 86400, "M": 30 * 86400, "A": 365 * 86400}
+
+
+def parse_period(period: str) -> int:
+    """Parse an Alpaca portfolio history period ("1D", "2W", "3M", "1A") into seconds."""
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"invalid period: {period}")
+    return int(match.group(1)) * _PERIOD_SECONDS[match.group(2)]
+
+
+def default_timeframe(period_seconds: int) -> str:
+    # Alpaca's defaults: 1Min below 7 days, 15Min below 30 days, otherwise 1D
+    if period_seconds < 7 * 86400:
+        return "1Min"
+    if period_seconds < 30 * 86400:
+        return "15Min"
+    return "1D"
+
+
+class EquityRing:
+    """Preallocated ring buffer of (timestamp, equity, profit_loss, base_value) points at a
+    fixed resolution. Points are left-labeled and hold the values as of the end of their window."""
+
+    __slots__ = ("resolution", "capacity", "ts", "equity", "profit_loss", "base_value", "head", "count")
+
+    def __init__(self, resolution: int, capacity: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.ts = array("q", bytes(8 * capacity))
+        self.equity = array("d", bytes(8 * capacity))
+        self.profit_loss = array("d", bytes(8 * capacity))
+        self.base_value = array("d", bytes(8 * capacity))
+        self.head = 0  # next slot to write
+        self.count = 0
+
+    def _slot(self, logical: int) -> int:
+        # Logical index 0 is the oldest point held
+        return (self.head - self.count + logical) % self.capacity
+
+    def last_ts(self) -> Optional[int]:
+        return self.ts[(self.head - 1) % self.capacity] if self.count else None
+
+    def last_equity(self) -> Optional[float]:
+        return self.equity[(self.head - 1) % self.capacity] if self.count else None
+
+    def record(self, now: int, equity: float, profit_loss: float, base_value: float) -> None:
+        bucket = now - now % self.resolution
+        last = self.last_ts()
+        if last is not None and bucket <= last:
+            # Same window: keep the latest values
+            slot = (self.head - 1) % self.capacity
+            self.equity[slot] = equity
+            self.profit_loss[slot] = profit_loss
+            self.base_value[slot] = base_value
+            return
+        if last is not None:
+            # Carry the previous values across windows with no recording, at most one full ring
+            prev = (self.head - 1) % self.capacity
+            prev_values = (self.equity[prev], self.profit_loss[prev], self.base_value[prev])
+            gap_start = max(last + self.resolution, bucket - (self.capacity - 1) * self.resolution)
+            for gap_ts in range(gap_start, bucket, self.resolution):
+                self._append(gap_ts, *prev_values)
+        self._append(bucket, equity, profit_loss, base_value)
+
+    def _append(self, bucket: int, equity: float, profit_loss: float, base_value: float) -> None:
+        slot = self.head
+        self.ts[slot] = bucket
+        self.equity[slot] = equity
+        self.profit_loss[slot] = profit_loss
+        self.base_value[slot] = base_value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _lower_bound(self, ts: int) -> int:
+        # First logical index with timestamp >= ts (timestamps increase with logical index)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._slot(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, start: int, end: int) -> Tuple[List[int], List[float], List[float], List[float]]:
+        """Points with start <= timestamp <= end, oldest first."""
+        first = self._lower_bound(start)
+        stop = self._lower_bound(end + 1)
+        timestamps, equity, profit_loss, base_value = [], [], [], []
+        for logical in range(first, stop):
+            slot = self._slot(logical)
+            timestamps.append(self.ts[slot])
+            equity.append(self.equity[slot])
+            profit_loss.append(self.profit_loss[slot])
+            base_value.append(self.base_value[slot])
+        return timestamps, equity, profit_loss, base_value
+
+
+class PortfolioHistory:
+    """Equity time series kept at several resolutions. Every recording updates each tier,
+    and queries slice the tier matching the requested timeframe."""
+
+    def __init__(self):
+        self.tiers: Dict[str, EquityRing] = {
+            timeframe: EquityRing(resolution, capacity) for timeframe, resolution, capacity in TIERS
+        }
+
+    def last_equity(self) -> Optional[float]:
+        return self.tiers[TIERS[0][0]].last_equity()
+
+    def record(self, now: int, equity: float, base_value: float) -> None:
+        profit_loss = equity - base_value
+        for ring in self.tiers.values():
+            ring.record(now, equity, profit_loss, base_value)
+
+    def query(self, timeframe: str, start: int, end: int) -> Dict[str, Any]:
+        ring = self.tiers.get(timeframe)
+        if ring is None:
+            raise ValueError(f"invalid timeframe: {timeframe}")
+        timestamps, equity, profit_loss, base_values = ring.slice(start, end)
+        return {
+            "timestamp": timestamps,
+            "equity": [round(e, 2) for e in equity],
+            "profit_loss": [round(p, 2) for p in profit_loss],
+            "profit_loss_pct": [round(p / b, 6) if b else 0.0 for p, b in zip(profit_loss, base_values)],
+            "base_value": round(base_values[0], 2) if base_values else None,
+            "timeframe": timeframe,
+        }
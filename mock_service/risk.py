@@ -0,0 +1,142 @@
+from typing import Dict, Any, Tuple
+
+from mock_service.assets import AssetTable, FLAG_MARGINABLE, FLAG_SHORTABLE, FLAG_EASY_TO_BORROW
+
+
+class RiskRejection(Exception):
+    """An order failed a pre-trade check; rendered as Alpaca's 403 (code 40310000)."""
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}"
+
+
+class RiskBook:
+    """Incremental pre-trade risk for the single mock account.
+
+    Cash, per-asset position quantity and mark price, the long/short market value and the
+    initial margin are running totals updated by each fill, and every open order holds a
+    buying-power reservation taken when it is accepted and released when it fills or is
+    canceled. Orders that close a position reserve nothing and instead hold the quantity they
+    close (sells against a long in held_for_sale, buys covering a short in held_for_cover).
+    Checking an order is therefore a few dict probes and arithmetic, however many orders are
+    open.
+
+    Margin follows a simplified Reg T model. A marginable position needs 1/multiplier of its
+    value as initial margin, anything else its full value; buying power is the equity in excess
+    of the initial margin, times the multiplier, minus open reservations. A multiplier of 1 is
+    a cash account, which cannot sell short.
+    """
+
+    def __init__(self, assets: AssetTable, cash: float, multiplier: int = 2, shorting_enabled: bool = True):
+        self.assets = assets
+        self.cash = cash
+        self.multiplier = max(1, multiplier)
+        self.shorting_enabled = shorting_enabled and self.multiplier > 1
+        self.qty: Dict[int, float] = {}       # asset row -> signed position quantity
+        self.mark: Dict[int, float] = {}      # asset row -> last fill price
+        self.held_for_sale: Dict[int, float] = {}  # asset row -> long quantity held by open sell orders
+        self.held_for_cover: Dict[int, float] = {}  # asset row -> short quantity held by open buy orders
+        self.long_market_value = 0.0
+        self.short_market_value = 0.0  # negative
+        self.initial_margin = 0.0
+        self.reserved = 0.0
+        # order row -> (asset row, reserved buying power, position quantity held, map holding it)
+        self._open: Dict[int, Tuple[int, float, float, Dict[int, float]]] = {}
+
+    def margin_rate(self, asset_row: int) -> float:
+        if self.multiplier > 1 and self.assets.has_flag(asset_row, FLAG_MARGINABLE):
+            return 1.0 / self.multiplier
+        return 1.0
+
+    def equity(self) -> float:
+        return self.cash + self.long_market_value + self.short_market_value
+
+    def buying_power(self) -> float:
+        return max(0.0, (self.equity() - self.initial_margin) * self.multiplier - self.reserved)
+
+    def check(self, asset_row: int, side: str, qty: float, price: float) -> Tuple[float, float]:
+        """Validate a new order; returns (buying power to reserve, position quantity to hold).
+
+        Raises RiskRejection when the order would overdraw buying power, sell more than the
+        available long position, or open a short the account or asset does not allow. A buy
+        covering a short needs no buying power up to the short quantity not already held by
+        other open buys."""
+        position = self.qty.get(asset_row, 0.0)
+        if side == "buy" and position < 0:
+            available = -position - self.held_for_cover.get(asset_row, 0.0)
+            if qty <= available + 1e-9:
+                return 0.0, qty
+        if side == "sell":
+            if position > 0 or not self.shorting_enabled:
+                # Closing a long: only the quantity not already held by open sells, never past zero
+                available = max(0.0, position - self.held_for_sale.get(asset_row, 0.0))
+                if qty > available + 1e-9:
+                    raise RiskRejection(f"insufficient qty available for order (requested: {qty:g}, available: {available:g})")
+                return 0.0, qty
+            if not (self.assets.has_flag(asset_row, FLAG_SHORTABLE) and self.assets.has_flag(asset_row, FLAG_EASY_TO_BORROW)):
+                raise RiskRejection(f"asset \"{self.assets.symbols[asset_row]}\" cannot be sold short")
+        cost = qty * price * self.margin_rate(asset_row) * self.multiplier
+        buying_power = self.buying_power()
+        if cost > buying_power + 1e-9:
+            raise RiskRejection(f"insufficient buying power (required: {_fmt(cost)}, available: {_fmt(buying_power)})")
+        return cost, 0.0
+
+    def reserve(self, order_row: int, asset_row: int, side: str, amount: float, held_qty: float) -> None:
+        held = self.held_for_cover if side == "buy" else self.held_for_sale
+        self._open[order_row] = (asset_row, amount, held_qty, held)
+        self.reserved += amount
+        if held_qty:
+            held[asset_row] = held.get(asset_row, 0.0) + held_qty
+
+    def release(self, order_row: int) -> None:
+        """Drop an order's reservation (it filled or was canceled); no-op for unknown orders."""
+        entry = self._open.pop(order_row, None)
+        if entry is None:
+            return
+        asset_row, amount, held_qty, held = entry
+        # Recompute from zero when nothing is open so float error cannot accumulate
+        self.reserved = self.reserved - amount if self._open else 0.0
+        if held_qty:
+            remaining = held[asset_row] - held_qty
+            if remaining > 1e-9:
+                held[asset_row] = remaining
+            else:
+                del held[asset_row]
+
+    def apply_fill(self, asset_row: int, side: str, qty: float, price: float) -> float:
+        """Book an execution against cash and the position; returns the new position quantity."""
+        old_qty = self.qty.get(asset_row, 0.0)
+        old_value = old_qty * self.mark.get(asset_row, price)
+        new_qty = old_qty + qty if side == "buy" else old_qty - qty
+        new_value = new_qty * price
+        self.cash += -qty * price if side == "buy" else qty * price
+        for value, sign in ((old_value, -1.0), (new_value, 1.0)):
+            if value > 0:
+                self.long_market_value += sign * value
+            else:
+                self.short_market_value += sign * value
+        self.initial_margin += (abs(new_value) - abs(old_value)) * self.margin_rate(asset_row)
+        if new_qty:
+            self.qty[asset_row] = new_qty
+            self.mark[asset_row] = price
+        else:
+            self.qty.pop(asset_row, None)
+            self.mark.pop(asset_row, None)
+        if not self.qty:
+            self.long_market_value = self.short_market_value = self.initial_margin = 0.0
+        return new_qty
+
+    def update_account(self, account: Dict[str, Any]) -> None:
+        """Write the cash, market value, margin and buying power fields of an account dict."""
+        excess = max(0.0, self.equity() - self.initial_margin)
+        buying_power = _fmt(self.buying_power())
+        account["cash"] = _fmt(self.cash)
+        account["long_market_value"] = _fmt(self.long_market_value)
+        account["short_market_value"] = _fmt(self.short_market_value)
+        account["initial_margin"] = _fmt(self.initial_margin)
+        account["buying_power"] = buying_power
+        account["regt_buying_power"] = buying_power
+        account["non_marginable_buying_power"] = _fmt(max(0.0, excess - self.reserved / self.multiplier))
+        account["multiplier"] = str(self.multiplier)
+        account["shorting_enabled"] = self.shorting_enabled
@@ -0,0 +1 @@
+# This file makes profiling a Python package.
@@ -0,0 +1,167 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+PROFILE_HEADER = b"x-profile"
+MODES = ("cprofile", "sampling")
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# cProfile and the sampler both watch the event loop thread, which serves every request, so one
+# profile at a time per process (both apps share a process in the launcher's single mode)
+_profile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Statistical profiler: a background thread records the stack of one thread at a fixed
+    interval. Output is a speedscope "sampled" profile."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = len(self.frames)
+            self._frame_index[key] = index
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()  # speedscope wants root first
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "alpaca-backend-simulator",
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling single requests on demand.
+
+    A request is profiled when it carries an X-Profile header (value "cprofile" or "sampling",
+    anything else picks the default mode) or, with sample_rate > 0, at random. cprofile writes
+    a deterministic pstats file (.prof), sampling a speedscope file (.speedscope.json), both into
+    directory; the response names the file in an X-Profile-File header. Anything else running
+    on the event loop while the request is in flight is part of the profile too. Only installed
+    when profiling is configured, so disabled profiling costs nothing.
+    """
+
+    def __init__(self, app, directory: str, service: str, mode: str = "cprofile", sample_rate: float = 0.0,
+                 sample_interval: float = 0.001):
+        if mode not in MODES:
+            raise ValueError(f"invalid profiling mode: {mode}")
+        self.app = app
+        self.directory = directory
+        self.service = service
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def requested_mode(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                value = value.decode("latin-1").strip().lower()
+                if value in ("0", "false", "no"):
+                    return None
+                return value if value in MODES else self.mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    async def __call__(self, scope, receive, send):
+        mode = self.requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.profile(mode, scope, receive, send)
+        finally:
+            _profile_lock.release()
+
+    async def profile(self, mode: str, scope, receive, send):
+        self.count += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = _UNSAFE_RE.sub("_", scope["path"].strip("/")) or "root"
+        base_name = f"{stamp}_{self.service}_{scope['method']}_{path}_{os.getpid()}-{self.count}"
+        filename = base_name + (".prof" if mode == "cprofile" else ".speedscope.json")
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", filename.encode())]
+            await send(message)
+
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger or an external tool) owns the hook
+                await self.app(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send_with_header)
+            finally:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.directory, filename))
+        else:
+            sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_with_header)
+            finally:
+                sampler.stop()
+                with open(os.path.join(self.directory, filename), "w") as f:
+                    json.dump(sampler.to_speedscope(f"{scope['method']} {scope['path']}"), f)
@@ -65,3 +65,19 @@ def mock_stock_data_client(mock_api_key, mock_secret_key, mock_market_data_base_
         secret_key=mock_secret_key,
         url_override=mock_market_data_base_url
     )
+
+@pytest.fixture(scope="session", autouse=True)
+def services_ready(mock_trading_base_url, mock_market_data_base_url):
+    # Services started right before the test run (e.g. `python launcher.py &` in CI) may still be warming up;
+    # wait for their /readyz instead of racing them. Gives up quietly so unreachable services fail in the tests.
+    import time
+    import requests
+    deadline = time.monotonic() + 15
+    for base_url in (mock_trading_base_url, mock_market_data_base_url):
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(f"{base_url}/readyz", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.1)
@@ -3,27 +3,50 @@ from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import (
     MarketOrderRequest,
     LimitOrderRequest,
-    GetOrdersRequest
+    GetOrdersRequest,
+    GetAssetsRequest,
+    GetPortfolioHistoryRequest
 )
 from alpaca.trading.enums import (
     OrderSide,
     TimeInForce,
     QueryOrderStatus,
     OrderStatus, # For asserting order.status
-    AccountStatus # For asserting account.status
+    AccountStatus, # For asserting account.status
+    AssetStatus,
+    AssetExchange
 )
 # Import specific model types for isinstance checks
-from alpaca.trading.models import Account, Position, Order
+from alpaca.trading.models import Account, Position, Order, Asset, PortfolioHistory
 from alpaca.data.historical.stock import StockHistoricalDataClient
-from alpaca.data.requests import StockLatestQuoteRequest, StockBarsRequest
+from alpaca.data.requests import StockLatestQuoteRequest, StockBarsRequest, StockSnapshotRequest, StockTradesRequest
 # from alpaca.data.enums import StockTimeFrame # Removed (ensuring it's gone)
 # from alpaca.data import TimeFrame # Removed
 from alpaca.data.timeframe import TimeFrame, TimeFrameUnit # Corrected import
-from alpaca.data.models import Quote, Bar
+from alpaca.data.models import Quote, Bar, Snapshot, Trade
 from alpaca.common.exceptions import APIError # For exception checking
 from datetime import datetime, timezone
 from decimal import Decimal # For precise numeric comparisons
 import uuid # For generating unique client_order_ids or symbols
+import requests
+
+def untraded_symbols(base_url: str, count: int) -> list:
+    """Random marginable, shortable listings of the asset universe that have no orders yet.
+
+    The trading service rejects orders for symbols outside its universe, so tests that need a
+    clean symbol draw one here instead of making one up."""
+    import random
+    assets = requests.get(f"{base_url}/v2/assets", params={"status": "active"}).json()
+    candidates = [a["symbol"] for a in assets
+                  if a["tradable"] and a["marginable"] and a["shortable"] and a["easy_to_borrow"]]
+    random.shuffle(candidates)
+    symbols = []
+    for symbol in candidates:
+        if not requests.get(f"{base_url}/v2/orders", params={"status": "all", "symbols": symbol}).json():
+            symbols.append(symbol)
+            if len(symbols) == count:
+                break
+    return symbols
 
 class TestAlpacaPyIntegration:
 
@@ -143,6 +166,24 @@ class TestAlpacaPyIntegration:
         else: # If loop completes without break
             pytest.fail(f"Accepted/New limit order for {symbol2} (ID: {order2.id}) not found with expected status.")
 
+    def test_orders_open_closed_and_client_order_id(self, mock_trading_client: TradingClient, mock_trading_base_url):
+        symbol, = untraded_symbols(mock_trading_base_url, 1)
+        client_order_id = f"alpy-{uuid.uuid4().hex[:12]}"
+        filled = mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=1.0, side=OrderSide.BUY, time_in_force=TimeInForce.DAY))
+        resting = mock_trading_client.submit_order(LimitOrderRequest(symbol=symbol, qty=1.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC,
+                                                                     limit_price=10.00, client_order_id=client_order_id))
+
+        open_orders = mock_trading_client.get_orders(filter=GetOrdersRequest(status=QueryOrderStatus.OPEN, symbols=[symbol]))
+        assert [o.id for o in open_orders] == [resting.id]
+        closed_orders = mock_trading_client.get_orders(filter=GetOrdersRequest(status=QueryOrderStatus.CLOSED, symbols=[symbol]))
+        assert [o.id for o in closed_orders] == [filled.id]
+        # Terminal orders are served from cached bytes; repeated reads must be identical
+        assert mock_trading_client.get_order_by_id(filled.id) == mock_trading_client.get_order_by_id(filled.id)
+
+        by_client_id = mock_trading_client.get_order_by_client_id(client_order_id)
+        assert by_client_id.id == resting.id
+        assert by_client_id.limit_price == "10.0"
+
 
     def test_place_sell_order_updates_position(self, mock_trading_client: TradingClient):
         symbol = f"ALPYSELL{uuid.uuid4().hex[:6].upper()}"
@@ -170,6 +211,270 @@ class TestAlpacaPyIntegration:
         assert pos_after_all_sold is None or pos_after_all_sold.qty == Decimal("0")
 
 
+    def test_get_all_assets_filtered(self, mock_trading_client: TradingClient):
+        assets = mock_trading_client.get_all_assets(GetAssetsRequest(status=AssetStatus.ACTIVE, exchange=AssetExchange.NASDAQ))
+        assert isinstance(assets, list)
+        assert len(assets) > 0
+        assert all(isinstance(a, Asset) for a in assets)
+        assert all(a.status == AssetStatus.ACTIVE and a.exchange == AssetExchange.NASDAQ for a in assets)
+        assert any(a.symbol == "AAPL" for a in assets)
+
+    def test_get_asset_by_symbol_and_id(self, mock_trading_client: TradingClient):
+        asset = mock_trading_client.get_asset("AAPL")
+        assert isinstance(asset, Asset)
+        assert asset.symbol == "AAPL"
+        assert asset.tradable
+        # The same asset is addressable by its id
+        same_asset = mock_trading_client.get_asset(asset.id)
+        assert same_asset.symbol == "AAPL"
+
+        with pytest.raises(APIError) as excinfo:
+            mock_trading_client.get_asset("NOSUCHASSET")
+        assert excinfo.value.response.status_code == 404
+
+    def test_order_and_position_use_stable_asset_id(self, mock_trading_client: TradingClient):
+        asset = mock_trading_client.get_asset("MSFT")
+        order = mock_trading_client.submit_order(MarketOrderRequest(symbol="MSFT", qty=1.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+        assert order.asset_id == asset.id
+
+        position = next(p for p in mock_trading_client.get_all_positions() if p.symbol == "MSFT")
+        assert position.asset_id == asset.id
+        assert position.exchange == asset.exchange
+
+    def test_portfolio_history_tracks_equity(self, mock_trading_client: TradingClient):
+        mock_trading_client.submit_order(MarketOrderRequest(symbol="TSLA", qty=1.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+        account = mock_trading_client.get_account()
+
+        history = mock_trading_client.get_portfolio_history(GetPortfolioHistoryRequest(period="1D", timeframe="1Min"))
+        assert isinstance(history, PortfolioHistory)
+        assert history.timeframe == "1Min"
+        assert len(history.timestamp) == len(history.equity) == len(history.profit_loss) > 0
+        assert history.timestamp == sorted(history.timestamp)
+        # Fills are recorded, so the latest point reflects the current equity
+        assert history.equity[-1] == pytest.approx(float(account.equity), abs=0.01)
+
+        # Longer periods are served from the coarser tiers
+        daily = mock_trading_client.get_portfolio_history(GetPortfolioHistoryRequest(period="1M"))
+        assert daily.timeframe == "1D"
+        assert len(daily.equity) >= 1
+
+    def test_buying_power_reservations_and_rejections(self, mock_trading_client: TradingClient, mock_trading_base_url):
+        symbol, other_symbol = untraded_symbols(mock_trading_base_url, 2)
+        buying_power = float(mock_trading_client.get_account().buying_power)
+
+        # An open limit order reserves its notional until it is canceled
+        resting = mock_trading_client.submit_order(LimitOrderRequest(symbol=symbol, qty=10.0, side=OrderSide.BUY,
+                                                                     time_in_force=TimeInForce.GTC, limit_price=20.00))
+        assert float(mock_trading_client.get_account().buying_power) == pytest.approx(buying_power - 200.0, abs=0.01)
+        mock_trading_client.cancel_order_by_id(resting.id)
+        assert mock_trading_client.get_order_by_id(resting.id).status == OrderStatus.CANCELED
+        assert float(mock_trading_client.get_account().buying_power) == pytest.approx(buying_power, abs=0.01)
+        resp = requests.delete(f"{mock_trading_base_url}/v2/orders/{resting.id}")
+        assert resp.status_code == 422
+
+        # Orders beyond buying power are rejected with Alpaca's 403
+        resp = requests.post(f"{mock_trading_base_url}/v2/orders", json={
+            "symbol": symbol, "qty": buying_power, "side": "buy", "type": "limit", "time_in_force": "gtc", "limit_price": 20.0})
+        assert resp.status_code == 403
+        assert resp.json()["code"] == 40310000
+        assert "insufficient buying power" in resp.json()["message"]
+
+        # A limit order without a limit price cannot be priced, so it is rejected before any reservation
+        resp = requests.post(f"{mock_trading_base_url}/v2/orders", json={
+            "symbol": symbol, "qty": 1.0, "side": "buy", "type": "limit", "time_in_force": "gtc"})
+        assert resp.status_code == 422
+        assert float(mock_trading_client.get_account().buying_power) == pytest.approx(buying_power, abs=0.01)
+
+        # Sells of a long position are limited to the quantity not held by other open sells
+        mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=5.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+        mock_trading_client.submit_order(LimitOrderRequest(symbol=symbol, qty=3.0, side=OrderSide.SELL,
+                                                           time_in_force=TimeInForce.GTC, limit_price=500.00))
+        with pytest.raises(APIError) as excinfo:
+            mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=3.0, side=OrderSide.SELL, time_in_force=TimeInForce.GTC))
+        assert excinfo.value.status_code == 403
+        assert "insufficient qty available" in str(excinfo.value)
+        mock_trading_client.cancel_orders()
+        mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=5.0, side=OrderSide.SELL, time_in_force=TimeInForce.GTC))
+
+        # From flat, a sell opens a short position (margin account)
+        mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=2.0, side=OrderSide.SELL, time_in_force=TimeInForce.GTC))
+        position = next(p for p in mock_trading_client.get_all_positions() if p.symbol == symbol)
+        assert float(position.qty) == -2.0
+
+        # Buys covering a short need no buying power, up to the short quantity not held by other open buys
+        buying_power = float(mock_trading_client.get_account().buying_power)
+        mock_trading_client.submit_order(LimitOrderRequest(symbol=other_symbol, qty=int(buying_power), side=OrderSide.BUY,
+                                                           time_in_force=TimeInForce.GTC, limit_price=1.00))
+        assert float(mock_trading_client.get_account().buying_power) < 1.0
+        resting = mock_trading_client.submit_order(LimitOrderRequest(symbol=symbol, qty=2.0, side=OrderSide.BUY,
+                                                                     time_in_force=TimeInForce.GTC, limit_price=1.00))
+        with pytest.raises(APIError) as excinfo:
+            mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=1.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+        assert excinfo.value.status_code == 403
+        mock_trading_client.cancel_order_by_id(resting.id)
+        mock_trading_client.submit_order(MarketOrderRequest(symbol=symbol, qty=2.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+        assert all(p.symbol != symbol for p in mock_trading_client.get_all_positions())
+        mock_trading_client.cancel_orders()
+
+    def test_account_activities_record_fills(self, mock_trading_client: TradingClient, mock_trading_base_url):
+        order = mock_trading_client.submit_order(MarketOrderRequest(symbol="MSFT", qty=2.0, side=OrderSide.BUY, time_in_force=TimeInForce.GTC))
+
+        fills = requests.get(f"{mock_trading_base_url}/v2/account/activities/FILL", params={"page_size": 1}).json()
+        assert len(fills) == 1
+        fill = fills[0]  # newest first
+        assert fill["activity_type"] == "FILL"
+        assert fill["order_id"] == str(order.id)
+        assert fill["symbol"] == "MSFT" and fill["side"] == "buy"
+        assert float(fill["qty"]) == 2.0
+
+        # Cursor pagination walks the whole ledger without repeats, ending at the opening deposit
+        seen, token = [], None
+        while True:
+            params = {"page_size": 2, **({"page_token": token} if token else {})}
+            page = requests.get(f"{mock_trading_base_url}/v2/account/activities", params=params).json()
+            if not page:
+                break
+            seen.extend(a["id"] for a in page)
+            token = page[-1]["id"]
+        assert len(seen) == len(set(seen)) >= 2
+        deposits = requests.get(f"{mock_trading_base_url}/v2/account/activities", params={"activity_types": "CSD"}).json()
+        assert deposits[0]["id"] == seen[-1]
+
+        resp = requests.get(f"{mock_trading_base_url}/v2/account/activities/NOT_A_TYPE")
+        assert resp.status_code == 422
+
+    def test_health_and_readiness(self, mock_trading_base_url, mock_market_data_base_url):
+        for base_url in (mock_trading_base_url, mock_market_data_base_url):
+            assert requests.get(f"{base_url}/healthz").json() == {"status": "ok"}
+            # The session waits for readiness, so both services must report ready by now
+            resp = requests.get(f"{base_url}/readyz")
+            assert resp.status_code == 200
+            assert resp.json() == {"status": "ready"}
+
+    def test_replay_recorded_traffic(self, mock_trading_base_url, mock_market_data_base_url, tmp_path):
+        from traffic.record import response_digest
+        from traffic.replay import replay
+        import asyncio
+        import json
+
+        asset_body = requests.get(f"{mock_trading_base_url}/v2/assets/AAPL").content
+        recording = [
+            {"service": "trading", "ts": 0.0, "method": "GET", "path": "/v2/assets/AAPL",
+             "status": 200, "digest": response_digest(asset_body)},
+            {"service": "trading", "ts": 0.01, "method": "GET", "path": f"/v2/orders/{uuid.uuid4()}", "status": 404},
+            {"service": "market_data", "ts": 0.02, "method": "GET", "path": "/v2/stocks/AAPL/trades",
+             "query": "start=2024-01-02T00:00:00Z&end=2024-01-02T01:00:00Z&limit=5", "status": 200},
+        ]
+        targets = {"trading": mock_trading_base_url, "market_data": mock_market_data_base_url}
+
+        for speed in (2.0, None):  # open-loop at 2x, then as fast as possible
+            report = asyncio.run(replay(recording, targets, speed))
+            assert report["requests"] == 3
+            assert report["errors"] == report["status_mismatches"] == report["body_mismatches"] == 0
+            assert set(report["latency_ms"]) == {"p50", "p90", "p99", "p99.9", "max"}
+            assert "GET /v2/orders/{id}" in report["endpoints"]
+        json.dumps(report)  # the report is plain JSON
+
+    def test_traffic_recorder_round_trip(self, tmp_path):
+        # Record a throwaway app served by uvicorn, then replay the file the recorder wrote
+        from fastapi import FastAPI, Request
+        from traffic.record import TrafficRecorder, load_recording, response_digest
+        from traffic.replay import replay
+        import asyncio
+        import json
+        import socket
+        import threading
+        import time
+        import uvicorn
+
+        path = tmp_path / "traffic.jsonl"
+        app = FastAPI()
+        app.add_middleware(TrafficRecorder, path=str(path), service="trading")
+
+        @app.get("/healthz")
+        async def healthz():
+            return {"status": "ok"}
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: str, verbose: bool = False):
+            return {"id": item_id, "verbose": verbose}
+
+        @app.post("/echo")
+        async def echo(request: Request):
+            return {"received": (await request.json())["value"]}
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        try:
+            while not server.started:
+                time.sleep(0.01)
+            base_url = f"http://127.0.0.1:{port}"
+            assert requests.get(f"{base_url}/healthz").status_code == 200
+            item = requests.get(f"{base_url}/items/7", params={"verbose": "true"})
+            echoed = requests.post(f"{base_url}/echo", json={"value": "hello"})
+            missing = requests.get(f"{base_url}/nowhere")
+
+            # The recorder writes an entry after the response is sent, so wait for the last one to land
+            deadline = time.monotonic() + 5.0
+            while True:
+                try:
+                    entries = load_recording(str(path))
+                except (OSError, ValueError):  # not created yet, or a line still being written
+                    entries = []
+                if len(entries) >= 3 or time.monotonic() > deadline:
+                    break
+                time.sleep(0.01)
+            assert [(e["method"], e["path"]) for e in entries] == [("GET", "/items/7"), ("POST", "/echo"), ("GET", "/nowhere")]
+            assert all(e["service"] == "trading" for e in entries)
+            assert entries[0]["query"] == "verbose=true"
+            assert json.loads(entries[1]["body"]) == {"value": "hello"}
+            assert entries[1]["headers"]["content-type"] == "application/json"
+            for entry, resp in zip(entries, (item, echoed, missing)):
+                assert entry["status"] == resp.status_code
+                assert entry["size"] == len(resp.content)
+                assert entry["digest"] == response_digest(resp.content)
+
+            report = asyncio.run(replay(entries, {"trading": base_url}, None))
+            assert report["requests"] == 3
+            assert report["errors"] == report["status_mismatches"] == report["body_mismatches"] == 0
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    def test_profiling_middleware_writes_profiles(self, tmp_path):
+        # Exercised on a throwaway app: the running services only install it when PROFILE_DIR is set
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from profiling.middleware import ProfilingMiddleware
+        import json
+        import pstats
+
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), service="test")
+
+        @app.get("/work")
+        async def work():
+            return {"total": sum(i * i for i in range(200000))}
+
+        client = TestClient(app)
+        assert "x-profile-file" not in client.get("/work").headers
+        assert list(tmp_path.iterdir()) == []
+
+        prof_name = client.get("/work", headers={"X-Profile": "1"}).headers["x-profile-file"]
+        assert prof_name.endswith(".prof")
+        stats = pstats.Stats(str(tmp_path / prof_name))
+        assert any(func[2] == "work" for func in stats.stats)
+
+        speedscope_name = client.get("/work", headers={"X-Profile": "sampling"}).headers["x-profile-file"]
+        speedscope = json.loads((tmp_path / speedscope_name).read_text())
+        profile = speedscope["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"])
+
     def test_get_latest_quote_integration(self, mock_stock_data_client: StockHistoricalDataClient):
         symbol = "AAPL" # Mock service returns this
         req = StockLatestQuoteRequest(symbol_or_symbols=symbol)
@@ -183,6 +488,25 @@ class TestAlpacaPyIntegration:
         assert isinstance(quote.ask_size, int)
         assert isinstance(quote.timestamp, datetime)
 
+    def test_latest_quotes_for_many_symbols(self, mock_market_data_base_url):
+        symbols = ["AAPL", "MSFT"] + [f"Q{i:03d}" for i in range(200)]
+        resp = requests.get(f"{mock_market_data_base_url}/v2/stocks/quotes/latest", params={"symbols": ",".join(symbols)})
+        assert resp.status_code == 200
+        quotes = resp.json()["quotes"]
+        assert set(quotes) == set(symbols)
+        for quote in quotes.values():
+            assert 0 < quote["bp"] < quote["ap"]
+            assert quote["as"] >= 1 and quote["bs"] >= 1
+
+        # Quotes and snapshots read the same arrays, and a traded symbol quotes around its last trade
+        for _ in range(5):
+            quote = requests.get(f"{mock_market_data_base_url}/v2/stocks/quotes/latest", params={"symbols": "AAPL"}).json()["quotes"]["AAPL"]
+            snapshot = requests.get(f"{mock_market_data_base_url}/v2/stocks/AAPL/snapshot").json()
+            if snapshot["latestQuote"]["t"] == quote["t"]:
+                break
+        assert snapshot["latestQuote"] == quote
+        assert abs((quote["ap"] + quote["bp"]) / 2 / snapshot["latestTrade"]["p"] - 1) < 0.01
+
     def test_get_bars_integration(self, mock_stock_data_client: StockHistoricalDataClient):
         symbol = "TSLA" # Mock service returns this
         req = StockBarsRequest(
@@ -202,3 +526,94 @@ class TestAlpacaPyIntegration:
         assert isinstance(bar.close, float)
         assert isinstance(bar.volume, float) # Mock service returns int, but SDK Bar model expects float
         assert isinstance(bar.timestamp, datetime)
+
+    def test_get_snapshots_integration(self, mock_stock_data_client: StockHistoricalDataClient):
+        symbols = ["AAPL", "MSFT"]
+        snapshots = mock_stock_data_client.get_stock_snapshot(StockSnapshotRequest(symbol_or_symbols=symbols))
+        assert set(symbols) <= set(snapshots.keys())
+        for symbol in symbols:
+            snapshot = snapshots[symbol]
+            assert isinstance(snapshot, Snapshot)
+            assert snapshot.latest_trade.price > 0
+            assert snapshot.latest_quote.ask_price >= snapshot.latest_quote.bid_price
+            # The minute bar is folded into the daily bar, so it lies within the day's range
+            assert snapshot.daily_bar.low <= snapshot.minute_bar.low <= snapshot.minute_bar.high <= snapshot.daily_bar.high
+            assert snapshot.daily_bar.close == snapshot.latest_trade.price
+            assert snapshot.previous_daily_bar is not None
+
+    def test_get_trades_paginated_integration(self, mock_stock_data_client: StockHistoricalDataClient, mock_market_data_base_url):
+        start = datetime(2023, 1, 3, tzinfo=timezone.utc)
+        end = datetime(2023, 1, 3, 6, tzinfo=timezone.utc)
+        all_trades = mock_stock_data_client.get_stock_trades(StockTradesRequest(symbol_or_symbols="AAPL", start=start, end=end))
+        trades = all_trades["AAPL"]
+        assert len(trades) > 0
+        assert all(isinstance(t, Trade) for t in trades)
+        assert all(start <= t.timestamp <= end for t in trades)
+        assert [t.timestamp for t in trades] == sorted(t.timestamp for t in trades)
+
+        # Walking the pages by hand returns the same trades, once each
+        url = f"{mock_market_data_base_url}/v2/stocks/AAPL/trades"
+        params = {"start": "2023-01-03T00:00:00Z", "end": "2023-01-03T06:00:00Z", "limit": 50}
+        paged_ids = []
+        while True:
+            page = requests.get(url, params=params).json()
+            assert len(page["trades"]) <= 50
+            paged_ids.extend(t["i"] for t in page["trades"])
+            if not page["next_page_token"]:
+                break
+            params["page_token"] = page["next_page_token"]
+        assert paged_ids == [t.id for t in trades]
+
+    def test_get_bars_paginated(self, mock_market_data_base_url):
+        url = f"{mock_market_data_base_url}/v2/stocks/AAPL/bars"
+        range_params = {"start": "2023-01-03T14:30:00Z", "end": "2023-01-03T16:00:00Z", "timeframe": "1Min"}
+        all_bars = requests.get(url, params=range_params).json()["bars"]
+        assert len(all_bars) > 10
+
+        # Following next_page_token walks the same bars, once each and in order
+        params = {**range_params, "limit": 10}
+        paged_times = []
+        for _ in range(len(all_bars)):
+            page = requests.get(url, params=params).json()
+            assert len(page["bars"]) <= 10
+            paged_times.extend(bar["t"] for bar in page["bars"])
+            if not page["next_page_token"]:
+                break
+            params["page_token"] = page["next_page_token"]
+        assert paged_times == [bar["t"] for bar in all_bars]
+
+    def test_bars_are_aggregated_from_trades(self, mock_stock_data_client: StockHistoricalDataClient, mock_market_data_base_url):
+        day_start = datetime(2023, 1, 4, tzinfo=timezone.utc)
+        day_end = datetime(2023, 1, 4, 23, 59, 59, 999999, tzinfo=timezone.utc)
+        trades = mock_stock_data_client.get_stock_trades(StockTradesRequest(symbol_or_symbols="MSFT", start=day_start, end=day_end))["MSFT"]
+
+        url = f"{mock_market_data_base_url}/v2/stocks/MSFT/bars"
+        daily_bar = requests.get(url, params={"start": "2023-01-04T00:00:00Z", "end": "2023-01-04T00:00:00Z", "timeframe": "1Day"}).json()["bars"][0]
+        assert daily_bar["o"] == trades[0].price
+        assert daily_bar["c"] == trades[-1].price
+        assert daily_bar["h"] == max(t.price for t in trades)
+        assert daily_bar["l"] == min(t.price for t in trades)
+        assert daily_bar["n"] == len(trades)
+
+        # Hourly bars roll up to the same day
+        hourly = requests.get(url, params={"start": "2023-01-04T00:00:00Z", "end": "2023-01-04T23:59:59Z", "timeframe": "1Hour"}).json()["bars"]
+        assert sum(b["v"] for b in hourly) == daily_bar["v"]
+        assert max(b["h"] for b in hourly) == daily_bar["h"]
+
+    def test_repeated_bar_queries_are_cached(self, mock_market_data_base_url):
+        url = f"{mock_market_data_base_url}/v2/stocks/AAPL/bars"
+        params = {"start": "2022-03-01T00:00:00Z", "end": "2022-03-31T00:00:00Z", "timeframe": "1Day"}
+        first = requests.get(url, params=params)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        # The same range written differently normalizes to the same cached body
+        again = requests.get(url, params={"start": "2022-03-01", "end": "2022-03-31", "timeframe": "1D"})
+        assert again.content == first.content
+        assert again.headers["ETag"] == etag
+
+        not_modified = requests.get(url, params=params, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+
+        stats = requests.get(f"{mock_market_data_base_url}/cache/stats").json()["bars"]
+        assert stats["hits"] >= 2
@@ -0,0 +1 @@
+# This file makes traffic a Python package.
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, Optional
+
+# Probe traffic (the launcher and CI poll these) is not worth replaying
+SKIPPED_PATHS = frozenset(("/healthz", "/readyz"))
+# Request headers that change how a request is served. Auth headers are never recorded.
+RECORDED_HEADERS = (b"content-type", b"if-none-match")
+
+
+def response_digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class TrafficRecorder:
+    """ASGI middleware appending one JSON line per request to a traffic log.
+
+    Each line holds the service name, wall-clock start time, method, path, query string,
+    selected headers and body of the request, plus the response status, size, body digest and
+    server-side duration. The file is opened in append mode and written a line at a time, so
+    several processes (both apps, or several workers) can share one log.
+    """
+
+    def __init__(self, app, path: str, service: str):
+        self.app = app
+        self.service = service
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", buffering=1, encoding="utf-8")  # line buffered
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in SKIPPED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        started_wall = time.time()
+        started = time.perf_counter()
+        body_parts = []
+        response: Dict[str, Any] = {"status": 0, "size": 0}
+        digest = hashlib.blake2b(digest_size=8)
+
+        async def recording_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                body_parts.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                digest.update(chunk)
+                response["size"] += len(chunk)
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            self.write(scope, started_wall, time.perf_counter() - started, b"".join(body_parts),
+                       response["status"], response["size"], digest.hexdigest())
+
+    def write(self, scope, started_wall: float, duration: float, body: bytes, status: int,
+              size: int, digest: str) -> None:
+        entry: Dict[str, Any] = {
+            "service": self.service,
+            "ts": round(started_wall, 6),
+            "method": scope["method"],
+            "path": scope["path"],
+        }
+        if scope.get("query_string"):
+            entry["query"] = scope["query_string"].decode("latin-1")
+        headers = {name.decode("latin-1"): value.decode("latin-1")
+                   for name, value in scope.get("headers", ()) if name in RECORDED_HEADERS}
+        if headers:
+            entry["headers"] = headers
+        if body:
+            try:
+                entry["body"] = body.decode("utf-8")
+            except UnicodeDecodeError:
+                entry["body_b64"] = base64.b64encode(body).decode("ascii")
+        entry.update({"status": status, "size": size, "digest": digest, "duration_ms": round(duration * 1000, 3)})
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def load_recording(path: str) -> list:
+    """Recorded requests in start-time order (lines from several processes may interleave)."""
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries
+
+
+def request_body(entry: Dict[str, Any]) -> Optional[bytes]:
+    if "body" in entry:
+        return entry["body"].encode("utf-8")
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return None
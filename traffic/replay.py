@@ -0,0 +1,162 @@
+"""Replay a recorded traffic log against running simulators and report latencies.
+
+    python -m traffic.replay traffic.jsonl                 # original pacing
+    python -m traffic.replay traffic.jsonl --speed 10      # 10x faster
+    python -m traffic.replay traffic.jsonl --speed max     # as fast as possible
+
+Timed replays are open-loop: every request is sent at its (scaled) recorded start time
+whether or not earlier ones have completed, and its latency is measured from that scheduled
+time, so server stalls show up as latency rather than as a slower send rate. "max" keeps
+--concurrency requests in flight. Responses are compared with the recording: status codes
+always, bodies by digest (dynamic responses such as new orders naturally differ).
+"""
+import argparse
+import asyncio
+import json
+import math
+import re
+import sys
+from collections import defaultdict
+from typing import Dict, List, Any, Optional
+
+from config.settings import MOCK_API_BASE_URL, MARKET_DATA_SIMULATOR_URL
+from traffic.record import load_recording, request_body, response_digest
+
+PERCENTILES = (50, 90, 99, 99.9)
+_ID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+def endpoint_of(entry: Dict[str, Any]) -> str:
+    return f"{entry['method']} {_ID_RE.sub('{id}', entry['path'])}"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    summary = {f"p{p:g}": round(percentile(values, p) * 1000, 3) for p in PERCENTILES}
+    summary["max"] = round(values[-1] * 1000, 3) if values else 0.0
+    return summary
+
+
+async def replay(entries: List[Dict[str, Any]], targets: Dict[str, str], speed: Optional[float],
+                 concurrency: int = 64, timeout: float = 10.0) -> Dict[str, Any]:
+    """Re-issue the recorded requests; speed None means as fast as possible."""
+    import httpx  # only the replay tool needs an async HTTP client
+
+    loop = asyncio.get_running_loop()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    clients = {service: httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+               for service, url in targets.items()}
+    in_flight = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    counts = {"requests": 0, "errors": 0, "status_mismatches": 0, "body_mismatches": 0}
+    mismatch_examples: List[Dict[str, Any]] = []
+
+    async def issue(entry: Dict[str, Any], due: float):
+        counts["requests"] += 1
+        client = clients.get(entry["service"])
+        url = entry["path"] + ("?" + entry["query"] if entry.get("query") else "")
+        try:
+            if client is None:
+                raise ValueError(f"no target for service {entry['service']}")
+            resp = await client.request(entry["method"], url, content=request_body(entry),
+                                        headers=entry.get("headers"))
+        except (httpx.HTTPError, ValueError) as e:
+            counts["errors"] += 1
+            if len(mismatch_examples) < 10:
+                mismatch_examples.append({"request": f"{entry['method']} {url}", "error": repr(e)})
+            return
+        finally:
+            if speed is None:
+                in_flight.release()
+        latencies[endpoint_of(entry)].append(loop.time() - due)
+        status_ok = resp.status_code == entry.get("status")
+        body_ok = "digest" not in entry or response_digest(resp.content) == entry["digest"]
+        counts["status_mismatches"] += not status_ok
+        counts["body_mismatches"] += status_ok and not body_ok
+        if not (status_ok and body_ok) and len(mismatch_examples) < 10:
+            mismatch_examples.append({"request": f"{entry['method']} {url}", "recorded_status": entry.get("status"),
+                                      "status": resp.status_code, "body_matches": body_ok})
+
+    started = loop.time()
+    first_ts = entries[0]["ts"] if entries else 0.0
+    tasks = []
+    try:
+        for entry in entries:
+            if speed is None:
+                await in_flight.acquire()
+                due = loop.time()
+            else:
+                due = started + (entry["ts"] - first_ts) / speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(issue(entry, due)))
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    elapsed = loop.time() - started
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(counts["requests"] / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": latency_summary(all_latencies),
+        "endpoints": {endpoint: {"count": len(values), **latency_summary(values)}
+                      for endpoint, values in sorted(latencies.items())},
+        "mismatch_examples": mismatch_examples,
+    }
+
+
+def format_report(report: Dict[str, Any], speed_label: str) -> str:
+    lines = [
+        f"Replayed {report['requests']} requests in {report['elapsed_s']}s "
+        f"({report['throughput_rps']} req/s, speed {speed_label})",
+        f"errors: {report['errors']}  status mismatches: {report['status_mismatches']}  "
+        f"body mismatches: {report['body_mismatches']}",
+        "latency ms: " + "  ".join(f"{name}={value}" for name, value in report["latency_ms"].items()),
+        "",
+        f"{'endpoint':<50} {'count':>7} {'p50':>9} {'p99':>9} {'max':>9}",
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(f"{endpoint[:50]:<50} {stats['count']:>7} {stats['p50']:>9} {stats['p99']:>9} {stats['max']:>9}")
+    for example in report["mismatch_examples"]:
+        lines.append(f"mismatch: {json.dumps(example)}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded simulator traffic log.")
+    parser.add_argument("recording", help="JSONL file written by the traffic recorder")
+    parser.add_argument("--speed", default="1", help='time scale factor, e.g. 1 or 10, or "max"')
+    parser.add_argument("--trading-url", default=MOCK_API_BASE_URL)
+    parser.add_argument("--market-data-url", default=MARKET_DATA_SIMULATOR_URL)
+    parser.add_argument("--concurrency", type=int, default=64, help="connections per service (in-flight limit for max)")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--report-json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    speed = None if args.speed == "max" else float(args.speed)
+    if speed is not None and speed <= 0:
+        parser.error("--speed must be positive or \"max\"")
+    entries = load_recording(args.recording)
+    targets = {"trading": args.trading_url, "market_data": args.market_data_url}
+    report = asyncio.run(replay(entries, targets, speed, args.concurrency, args.timeout))
+    print(format_report(report, args.speed if speed is None else f"{speed:g}x"))
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] or report["status_mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())